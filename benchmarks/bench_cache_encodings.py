@@ -0,0 +1,44 @@
+"""
+Measures the cost of committing nodes which have already been encoded, as
+when the same uncommitted nodes are shared by several tries, with and without
+cached encodings.  Also reports the memory held by cached encodings.
+
+Usage: python benchmarks/bench_cache_encodings.py [num_keys]
+"""
+import os
+import sys
+import timeit
+import tracemalloc
+
+from simpletrie.trie import (
+    SimpleTrie,
+    commit_node,
+)
+
+
+def main(num_keys: int=20000) -> None:
+    t = SimpleTrie()
+    t.update((os.urandom(32), os.urandom(32)) for _ in range(num_keys))
+    root = t._root
+
+    for cache in (False, True):
+        # Encodings cached by the first commit are reused by later ones
+        commit_node(root, {}, cache)
+        best = min(timeit.repeat(lambda: commit_node(root, {}, cache), number=1, repeat=5))
+        print('cache={!s:<6} {:>8.1f} ms per commit'.format(cache, best * 1000))
+
+    # Fresh copy of the trie with no cached encodings
+    t = SimpleTrie()
+    t.update((os.urandom(32), os.urandom(32)) for _ in range(num_keys))
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    commit_node(t._root, {}, cache=True)
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print('cached encodings hold {:.1f} MiB'.format((after - before) / 2 ** 20))
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:]))
@@ -0,0 +1,43 @@
+"""
+Measures how ``SimpleTrie.from_items`` scales with the number of worker
+processes.
+
+Usage: python benchmarks/bench_from_items.py [num_items] [max_workers]
+"""
+import os
+import sys
+import time
+
+from simpletrie import SimpleTrie
+
+
+def main(num_items: int=200000, max_workers: int=None) -> None:
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+
+    items = [(os.urandom(32), os.urandom(32)) for _ in range(num_items)]
+
+    baseline = None
+    serial_root = None
+
+    workers = 1
+    while workers <= max_workers:
+        start = time.perf_counter()
+        t = SimpleTrie.from_items(items, workers=workers)
+        elapsed = time.perf_counter() - start
+
+        if baseline is None:
+            baseline = elapsed
+            serial_root = t._root
+        else:
+            assert t._root == serial_root
+
+        print('{:>3} workers {:>10.3f} s {:>8.2f}x'.format(
+            workers, elapsed, baseline / elapsed,
+        ))
+
+        workers *= 2
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:]))
@@ -0,0 +1,65 @@
+"""
+Compares ``SimpleTrie.get_many`` against a loop of ``SimpleTrie.__getitem__``
+lookups.
+
+Usage: python benchmarks/bench_get_many.py [num_keys] [num_lookups]
+"""
+import os
+import random
+import sys
+import timeit
+
+from simpletrie import SimpleTrie
+
+
+def random_keys(n: int) -> list:
+    return [os.urandom(32) for _ in range(n)]
+
+
+def prefixed_keys(n: int) -> list:
+    # Storage-style keys grouped under a small number of account prefixes
+    accounts = [os.urandom(20) for _ in range(max(1, n // 1000))]
+    return [random.choice(accounts) + os.urandom(32) for _ in range(n)]
+
+
+def bench(label: str, keys: list, num_lookups: int) -> None:
+    t = SimpleTrie()
+    for k in keys:
+        t[k] = k
+
+    # Half hits, half misses which share a prefix with some present key
+    hits = random.sample(keys, num_lookups // 2)
+    misses = [
+        k[:-4] + os.urandom(4)
+        for k in random.sample(keys, num_lookups - num_lookups // 2)
+    ]
+    lookups = hits + misses
+    random.shuffle(lookups)
+
+    def getitem_loop():
+        values = []
+        for k in lookups:
+            try:
+                values.append(t[k])
+            except KeyError:
+                values.append(None)
+        return values
+
+    def get_many():
+        return t.get_many(lookups)
+
+    assert getitem_loop() == get_many()
+
+    print(label)
+    for name, f in (('__getitem__ loop', getitem_loop), ('get_many', get_many)):
+        best = min(timeit.repeat(f, number=10, repeat=5)) / 10
+        print('  {:<20} {:>10.3f} ms'.format(name, best * 1000))
+
+
+def main(num_keys: int=10000, num_lookups: int=500) -> None:
+    bench('random keys', random_keys(num_keys), num_lookups)
+    bench('prefixed keys', prefixed_keys(num_keys), num_lookups)
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:]))
@@ -0,0 +1,102 @@
+"""
+Measures the memory saved by interning values and node keys, and the read and
+write latency with and without an intern pool, on two datasets:
+
+* accounts: a ``SecureTrie`` of RLP encoded accounts in which most accounts
+  have no code or storage and many have a zero balance
+* sequential: a ``SimpleTrie`` keyed by sequential 8-byte integers with a few
+  distinct small values, as in block-indexed tables
+
+Usage: python benchmarks/bench_interning.py [num_keys]
+"""
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+from simpletrie.interning import InternPool
+from simpletrie.secure_trie import SecureTrie
+from simpletrie.trie import SimpleTrie
+from simpletrie.utils import rlp_encode
+
+
+EMPTY_ROOT = bytes.fromhex('56e81f171bcc55a6ff8345e692c0f86e5b48e01b996cadc001622fb5e363b421')
+EMPTY_CODE_HASH = bytes.fromhex('c5d2460186f7233c927e7db2dcc703c0e500b653ca82273b7bfad8045d85a470')
+
+
+def int_to_bytes(n: int) -> bytes:
+    return n.to_bytes((n.bit_length() + 7) // 8, 'big')
+
+
+def accounts(num_keys: int):
+    rand = random.Random(0)
+
+    for _ in range(num_keys):
+        if rand.random() < 0.9:
+            storage_root, code_hash = EMPTY_ROOT, EMPTY_CODE_HASH
+        else:
+            storage_root, code_hash = os.urandom(32), os.urandom(32)
+
+        balance = 0 if rand.random() < 0.6 else rand.randrange(10 ** 18)
+        nonce = rand.randrange(3)
+
+        yield os.urandom(20), rlp_encode([
+            int_to_bytes(nonce),
+            int_to_bytes(balance),
+            storage_root,
+            code_hash,
+        ])
+
+
+def sequential(num_keys: int):
+    rand = random.Random(0)
+
+    for i in range(num_keys):
+        yield i.to_bytes(8, 'big'), int_to_bytes(rand.randrange(4)) + b'\x00' * 31
+
+
+def measure(make_trie, items):
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+
+    start = time.perf_counter()
+    t = make_trie()
+    for k, v in items:
+        # Each value is a distinct object held only by the trie, as when
+        # values are decoded from blocks
+        t[k] = bytes(bytearray(v))
+    write = time.perf_counter() - start
+
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    keys = [k for k, _ in items]
+    start = time.perf_counter()
+    for k in keys:
+        t[k]
+    read = time.perf_counter() - start
+
+    return size - base, write / len(items), read / len(items)
+
+
+def main(num_keys: int=50000) -> None:
+    for name, dataset, cls in (
+        ('accounts', accounts, SecureTrie),
+        ('sequential', sequential, SimpleTrie),
+    ):
+        items = list(dataset(num_keys))
+
+        for label, make_trie in (
+            ('no pool', lambda: cls()),
+            ('pool', lambda: cls(intern_pool=InternPool())),
+        ):
+            size, write, read = measure(make_trie, items)
+
+            print('{:<11} {:<8} {:>8.1f} MiB {:>7.2f} us/write {:>7.2f} us/read'.format(
+                name, label, size / 2 ** 20, write * 1e6, read * 1e6,
+            ))
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:]))
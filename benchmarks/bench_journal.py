@@ -0,0 +1,47 @@
+"""
+Compares write throughput of a ``SimpleTrie`` with that of a ``JournaledTrie``
+at several group commit sizes.
+
+Usage: python benchmarks/bench_journal.py [num_writes]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from simpletrie import (
+    JournaledTrie,
+    SimpleTrie,
+)
+
+
+def report(label: str, num_writes: int, elapsed: float) -> None:
+    print('{:<28} {:>10.0f} writes/s'.format(label, num_writes / elapsed))
+
+
+def main(num_writes: int=20000) -> None:
+    items = [(os.urandom(32), os.urandom(64)) for _ in range(num_writes)]
+
+    t = SimpleTrie()
+    start = time.perf_counter()
+    for k, v in items:
+        t[k] = v
+    report('unjournaled', num_writes, time.perf_counter() - start)
+
+    for sync_every in (1, 10, 100, 1000):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, 'trie.journal')
+
+            # Disable time based syncs so that only group size triggers them
+            with JournaledTrie(path, {}, sync_every, sync_interval=3600) as jt:
+                start = time.perf_counter()
+                for k, v in items:
+                    jt[k] = v
+                jt.sync()
+                elapsed = time.perf_counter() - start
+
+        report('journaled, sync every {}'.format(sync_every), num_writes, elapsed)
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:]))
@@ -0,0 +1,85 @@
+"""
+Compares pickling a ``SimpleTrie`` in flattened form against pickling its
+graph of node objects, as pickle does by default for classes with slots.
+
+Usage: python benchmarks/bench_pickle.py [num_keys]
+"""
+import copyreg
+import gc
+import io
+import os
+import pickle
+import sys
+import timeit
+
+from simpletrie import (
+    Branch,
+    Extension,
+    HashNode,
+    Leaf,
+    SimpleTrie,
+)
+
+
+def reduce_slots(obj):
+    state = {s: getattr(obj, s) for s in type(obj)._all_slots()}
+    return copyreg.__newobj__, (type(obj),), (None, state)
+
+
+def restore_trie(root, db, cache_encodings, intern_pool):
+    t = SimpleTrie(db, cache_encodings=cache_encodings, intern_pool=intern_pool)
+    t._root = root
+    return t
+
+
+def reduce_trie(t):
+    # Bypasses SimpleTrie.__getstate__ so that the root is pickled as nodes
+    return restore_trie, (t._root, t.db, t.cache_encodings, t.intern_pool)
+
+
+class ObjectGraphPickler(pickle.Pickler):
+    dispatch_table = copyreg.dispatch_table.copy()
+    dispatch_table.update({
+        Leaf: reduce_slots,
+        Extension: reduce_slots,
+        Branch: reduce_slots,
+        HashNode: reduce_slots,
+        SimpleTrie: reduce_trie,
+    })
+
+
+def object_graph_dumps(obj):
+    f = io.BytesIO()
+    ObjectGraphPickler(f, pickle.HIGHEST_PROTOCOL).dump(obj)
+    return f.getvalue()
+
+
+def main(num_keys: int=50000) -> None:
+    t = SimpleTrie.from_items(
+        (os.urandom(32), os.urandom(32)) for _ in range(num_keys)
+    )
+    items = list(t.items())
+
+    for name, dumps in (
+        ('object graph', object_graph_dumps),
+        ('flattened', lambda t: pickle.dumps(t, pickle.HIGHEST_PROTOCOL)),
+    ):
+        data = dumps(t)
+        assert list(pickle.loads(data).items()) == items
+
+        # Garbage collection is left enabled since it is a large part of the
+        # cost of loading many objects
+        dumps_time = min(timeit.repeat(
+            lambda: dumps(t), 'gc.enable()', number=1, repeat=5, globals={'gc': gc},
+        ))
+        loads_time = min(timeit.repeat(
+            lambda: pickle.loads(data), 'gc.enable()', number=1, repeat=5, globals={'gc': gc},
+        ))
+
+        print('{:<14} dumps {:>8.3f} s  loads {:>8.3f} s  size {:>10} bytes'.format(
+            name, dumps_time, loads_time, len(data),
+        ))
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:]))
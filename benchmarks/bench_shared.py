@@ -0,0 +1,53 @@
+"""
+Compares the memory needed to give each worker process a copy of a trie
+against a single shared image of it, and the lookup throughput of a
+``SharedTrieReader`` against a ``SimpleTrie``.
+
+Usage: python benchmarks/bench_shared.py [num_keys]
+"""
+import os
+import pickle
+import sys
+import timeit
+import tracemalloc
+
+from simpletrie.shared import (
+    SharedTrieReader,
+    SharedTrieWriter,
+    build_image,
+)
+from simpletrie.trie import SimpleTrie
+
+
+def main(num_keys: int=100000) -> None:
+    items = [(os.urandom(32), os.urandom(32)) for _ in range(num_keys)]
+    keys = [k for k, _ in items]
+    data = pickle.dumps(SimpleTrie.from_items(items))
+
+    # Each worker which loads a pickled trie holds its own copy of the nodes
+    tracemalloc.start()
+    t = pickle.loads(data)
+    copy_size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    image_size = len(build_image(t))
+    print('per-process copy {:>8.1f} MiB'.format(copy_size / 2 ** 20))
+    print('shared image     {:>8.1f} MiB'.format(image_size / 2 ** 20))
+
+    with SharedTrieWriter() as writer:
+        best = min(timeit.repeat(lambda: writer.publish(t), number=1, repeat=3))
+        print('publish          {:>8.1f} ms'.format(best * 1000))
+
+        with SharedTrieReader(writer.name) as reader:
+            for name, f in (
+                ('trie get', lambda: [t[k] for k in keys]),
+                ('reader get', lambda: [reader[k] for k in keys]),
+                ('trie get_many', lambda: t.get_many(keys)),
+                ('reader get_many', lambda: reader.get_many(keys)),
+            ):
+                best = min(timeit.repeat(f, number=1, repeat=3))
+                print('{:<16} {:>8.0f} lookups/s'.format(name, num_keys / best))
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:]))
@@ -0,0 +1,76 @@
+"""
+Compares batches of writes made directly to a ``SimpleTrie`` against the same
+batches made within a transaction, by throughput and by the number of nodes
+created.
+
+Usage: python benchmarks/bench_transaction.py [num_keys] [batch_size]
+"""
+import os
+import sys
+import timeit
+
+from simpletrie.trie import (
+    Branch,
+    Extension,
+    Leaf,
+    SimpleTrie,
+)
+
+
+def count_nodes(f) -> int:
+    """
+    Returns the number of nodes created by calling ``f``.
+    """
+    count = [0]
+    originals = {}
+
+    for cls in (Branch, Extension, Leaf):
+        def init(self, *args, _init=cls.__init__, **kwargs):
+            count[0] += 1
+            _init(self, *args, **kwargs)
+
+        originals[cls] = cls.__init__
+        cls.__init__ = init
+
+    try:
+        f()
+    finally:
+        for cls, init in originals.items():
+            cls.__init__ = init
+
+    return count[0]
+
+
+def main(num_keys: int=20000, batch_size: int=2000) -> None:
+    base = SimpleTrie()
+    base.update((os.urandom(32), os.urandom(32)) for _ in range(num_keys))
+
+    # Half of each batch overwrites existing keys
+    keys = list(base)
+    batch = [
+        (keys[i] if i % 2 else os.urandom(32), os.urandom(32))
+        for i in range(batch_size)
+    ]
+    # Write each key twice, as when a batch updates the same accounts
+    batch = batch + [(k, os.urandom(32)) for k, _ in batch]
+
+    def direct():
+        t = SimpleTrie()
+        t._root = base._root
+        t.update(batch)
+
+    def transaction():
+        t = SimpleTrie()
+        t._root = base._root
+        with t.transaction() as tx:
+            tx.update(batch)
+
+    for name, f in (('direct', direct), ('transaction', transaction)):
+        best = min(timeit.repeat(f, number=1, repeat=5))
+        print('{:<12} {:>10.0f} writes/s {:>10} nodes created'.format(
+            name, len(batch) / best, count_nodes(f),
+        ))
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:]))
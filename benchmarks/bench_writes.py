@@ -0,0 +1,47 @@
+"""
+Compares write throughput of the iterative write path used by ``SimpleTrie``
+against the recursive ``Node.insert`` and ``Node.delete`` operations.
+
+Usage: python benchmarks/bench_writes.py [num_keys]
+"""
+import os
+import sys
+import timeit
+
+from simpletrie.trie import (
+    Leaf,
+    delete_key,
+    insert_key,
+)
+from simpletrie.utils import bytes_to_nibbles
+
+
+def main(num_keys: int=20000) -> None:
+    items = [
+        (tuple(bytes_to_nibbles(os.urandom(32))), os.urandom(32))
+        for _ in range(num_keys)
+    ]
+
+    def recursive():
+        root = None
+        for k, v in items:
+            root += Leaf(k, v)
+        for k, _ in items:
+            root -= k
+        return root
+
+    def iterative():
+        root = None
+        for k, v in items:
+            root = insert_key(root, k, v)
+        for k, _ in items:
+            root = delete_key(root, k)
+        return root
+
+    for name, f in (('recursive', recursive), ('iterative', iterative)):
+        best = min(timeit.repeat(f, number=1, repeat=3))
+        print('{:<10} {:>10.0f} writes/s'.format(name, 2 * num_keys / best))
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:]))
@@ -0,0 +1,443 @@
+"""
+Differential performance harness.  Generates a workload of Zipfian reads,
+block-shaped write batches, deletes and prefix scans, replays it against a
+``SimpleTrie`` and a ``dict`` oracle and checks that every result matches.
+Reports per-op latency percentiles and peak memory for both.
+
+Costs are measured as ratios of the trie's cost to the dict's cost on the same
+workload and machine, so that they hold across machines.  ``budget.json``
+records baseline ratios along with a tolerance for each statistic.  Exits with
+a non-zero status if any ratio exceeds its baseline times its tolerance or if
+any result differs.  With ``--record``, the median ratios over all runs are
+written to the budget as its new baseline instead.
+
+Usage: python benchmarks/harness.py [--seed N] [--runs N] [--keys N] [--ops N]
+                                    [--budget PATH] [--record]
+"""
+from bisect import bisect_left
+from itertools import accumulate
+from statistics import median
+from typing import (
+    Any,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+from simpletrie.cursor import TrieCursor
+from simpletrie.trie import SimpleTrie
+
+
+GET = 'get'
+WRITE_BLOCK = 'write_block'
+DELETE = 'delete'
+SCAN = 'scan'
+
+OPS = (GET, WRITE_BLOCK, DELETE, SCAN)
+
+Op = Tuple[Any, ...]
+Workload = Tuple[List[Tuple[bytes, bytes]], List[Op]]
+
+DEFAULT_BUDGET = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'budget.json')
+
+
+class MismatchError(AssertionError):
+    """
+    Raised when the trie and the oracle give different results for an op.
+    """
+    pass
+
+
+def generate_workload(seed: int,
+                      num_keys: int=10000,
+                      num_ops: int=5000,
+                      zipf_s: float=1.1,
+                      mix: Tuple[float, ...]=(0.8, 0.1, 0.05, 0.05)) -> Workload:
+    """
+    Returns initial items and a list of ops generated from ``seed``.  Keys are
+    a mix of 32-byte hashes and storage-style keys which share 20-byte account
+    prefixes.  Reads, deletes and the keys overwritten by write batches are
+    drawn from a Zipf distribution with exponent ``zipf_s`` over a key
+    universe which includes keys that are never written.  ``mix`` gives the
+    proportions of gets, write blocks, deletes and scans.
+    """
+    rand = random.Random(seed)
+
+    def rand_bytes(n: int) -> bytes:
+        return bytes(rand.getrandbits(8) for _ in range(n))
+
+    accounts = [rand_bytes(20) for _ in range(max(1, num_keys // 200))]
+
+    def new_key() -> bytes:
+        if rand.random() < 0.5:
+            return rand_bytes(32)
+
+        return rand.choice(accounts) + rand_bytes(32)
+
+    def new_value() -> bytes:
+        # Many values are small or repeated, as with balances and slots
+        if rand.random() < 0.3:
+            return b'\x00' * 32
+
+        return rand_bytes(rand.choice((1, 8, 32, 70)))
+
+    universe = [new_key() for _ in range(num_keys * 5 // 4)]
+    items = [(k, new_value()) for k in universe[:num_keys]]
+    rand.shuffle(universe)
+
+    cum_weights = list(accumulate(1 / (i + 1) ** zipf_s for i in range(len(universe))))
+
+    def zipf_key() -> bytes:
+        return universe[bisect_left(cum_weights, rand.random() * cum_weights[-1])]
+
+    cum_mix = list(accumulate(mix))
+
+    ops = []  # type: List[Op]
+    for _ in range(num_ops):
+        kind = OPS[min(bisect_left(cum_mix, rand.random() * cum_mix[-1]), len(OPS) - 1)]
+
+        if kind == GET:
+            ops.append((GET, zipf_key()))
+
+        elif kind == WRITE_BLOCK:
+            # Blocks update hot keys and create some new ones
+            size = rand.randint(10, 200)
+            ops.append((WRITE_BLOCK, [
+                (zipf_key() if rand.random() < 0.7 else new_key(), new_value())
+                for _ in range(size)
+            ]))
+
+        elif kind == DELETE:
+            ops.append((DELETE, zipf_key()))
+
+        else:
+            key = zipf_key()
+            ops.append((SCAN, key[:rand.choice((1, 2, 20))], rand.choice((10, 100))))
+
+    return items, ops
+
+
+def prefix_stop(prefix: bytes) -> Optional[bytes]:
+    """
+    Returns the least key greater than all keys which begin with ``prefix``,
+    or ``None`` if there is no such key.
+    """
+    prefix = prefix.rstrip(b'\xff')
+    if not prefix:
+        return None
+
+    return prefix[:-1] + bytes((prefix[-1] + 1,))
+
+
+class DictTarget:
+    """
+    The reference implementation of each op.
+    """
+    name = 'dict'
+
+    def __init__(self, items: List[Tuple[bytes, bytes]]) -> None:
+        self.d = dict(items)
+
+    def get(self, key: bytes) -> Optional[bytes]:
+        return self.d.get(key)
+
+    def write_block(self, items: List[Tuple[bytes, bytes]]) -> None:
+        self.d.update(items)
+
+    def delete(self, key: bytes) -> bool:
+        return self.d.pop(key, None) is not None
+
+    def scan(self, prefix: bytes, limit: int) -> List[Tuple[bytes, bytes]]:
+        return sorted(item for item in self.d.items() if item[0].startswith(prefix))[:limit]
+
+
+class TrieTarget:
+    """
+    Each op carried out by a ``SimpleTrie``.  Write blocks are applied in a
+    transaction and scans use a ``TrieCursor``.
+    """
+    name = 'trie'
+
+    def __init__(self, items: List[Tuple[bytes, bytes]]) -> None:
+        self.t = SimpleTrie.from_items(items)
+
+    def get(self, key: bytes) -> Optional[bytes]:
+        try:
+            return self.t[key]
+        except KeyError:
+            return None
+
+    def write_block(self, items: List[Tuple[bytes, bytes]]) -> None:
+        with self.t.transaction() as tx:
+            tx.update(items)
+
+    def delete(self, key: bytes) -> bool:
+        try:
+            del self.t[key]
+        except KeyError:
+            return False
+
+        return True
+
+    def scan(self, prefix: bytes, limit: int) -> List[Tuple[bytes, bytes]]:
+        return TrieCursor(self.t).range(prefix, prefix_stop(prefix), limit)
+
+
+def replay(workload: Workload) -> Dict[str, Dict[str, List[int]]]:
+    """
+    Replays ``workload`` against both targets, checking that the results of
+    each op and the final contents match, and returns the latency in
+    nanoseconds of each op by target and op kind.
+    """
+    items, ops = workload
+    targets = [DictTarget(items), TrieTarget(items)]
+
+    latencies = {
+        target.name: {kind: [] for kind in OPS}
+        for target in targets
+    }  # type: Dict[str, Dict[str, List[int]]]
+
+    clock = time.perf_counter_ns
+
+    for i, (kind, *args) in enumerate(ops):
+        results = []
+
+        for target in targets:
+            f = getattr(target, kind)
+
+            start = clock()
+            result = f(*args)
+            latencies[target.name][kind].append(clock() - start)
+
+            results.append(result)
+
+        if results[0] != results[1]:
+            raise MismatchError('Op {} {} gave {!r} but expected {!r}'.format(
+                i, kind, results[1], results[0],
+            ))
+
+    oracle, trie = targets
+    if list(trie.t.items()) != sorted(oracle.d.items()):
+        raise MismatchError('Final contents differ')
+
+    return latencies
+
+
+def peak_memory(target_cls: type, workload: Workload) -> int:
+    """
+    Returns the peak memory in bytes allocated while loading and replaying
+    ``workload`` against a target of type ``target_cls``.
+    """
+    items, ops = workload
+
+    tracemalloc.start()
+    try:
+        target = target_cls(items)
+        for kind, *args in ops:
+            getattr(target, kind)(*args)
+
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return peak
+
+
+def percentile(values: List[int], p: float) -> float:
+    """
+    Returns the ``p``-th percentile of ``values`` by the nearest rank.
+    """
+    if not values:
+        return 0.0
+
+    ordered = sorted(values)
+    rank = max(1, min(len(ordered), int(round(p / 100 * len(ordered)))))
+
+    return float(ordered[rank - 1])
+
+
+def summarize(latencies: Dict[str, Dict[str, List[int]]],
+              memory: Dict[str, int]) -> Dict[str, Any]:
+    """
+    Returns latency percentiles and peak memory by target along with the
+    ratio of the trie's figures to the dict's.
+    """
+    summary = {'ratios': {}}  # type: Dict[str, Any]
+
+    for name, by_kind in latencies.items():
+        summary[name] = {
+            kind: {
+                'p50': percentile(values, 50),
+                'p99': percentile(values, 99),
+            }
+            for kind, values in by_kind.items()
+            if values
+        }
+        summary[name]['peak_memory'] = memory[name]
+
+    for kind, stats in summary['trie'].items():
+        if kind == 'peak_memory':
+            continue
+
+        summary['ratios'][kind] = {
+            p: stats[p] / max(summary['dict'][kind][p], 1.0)
+            for p in ('p50', 'p99')
+        }
+
+    summary['ratios']['peak_memory'] = memory['trie'] / max(memory['dict'], 1)
+
+    return summary
+
+
+def check_budget(summary: Dict[str, Any], budget: Dict[str, Any]) -> List[str]:
+    """
+    Returns a description of each ratio in ``summary`` which exceeds its
+    baseline ratio in ``budget`` times the tolerance for its statistic.
+    """
+    violations = []
+    ratios = summary['ratios']
+    tolerance = budget['tolerance']
+
+    def check(label: str, ratio: float, baseline: float, factor: float) -> None:
+        if ratio > baseline * factor:
+            violations.append('{} ratio {:.2f} exceeds {:.2f} (baseline {:.2f} x {})'.format(
+                label, ratio, baseline * factor, baseline, factor,
+            ))
+
+    for kind, baselines in sorted(budget['baseline'].items()):
+        if kind == 'peak_memory':
+            check(kind, ratios[kind], baselines, tolerance[kind])
+            continue
+
+        if kind not in ratios:
+            continue
+
+        for p, baseline in sorted(baselines.items()):
+            check('{} {}'.format(kind, p), ratios[kind][p], baseline, tolerance[p])
+
+    return violations
+
+
+def record_baseline(summaries: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Returns the median of each ratio over ``summaries``, rounded to two
+    decimal places, as a baseline for a budget.  The median is used so that
+    one noisy run does not loosen the budget.
+    """
+    samples = {}  # type: Dict[Tuple[str, ...], List[float]]
+
+    for summary in summaries:
+        for kind, ratio in summary['ratios'].items():
+            if kind == 'peak_memory':
+                samples.setdefault((kind,), []).append(ratio)
+                continue
+
+            for p, r in ratio.items():
+                samples.setdefault((kind, p), []).append(r)
+
+    baseline = {}  # type: Dict[str, Any]
+
+    for path, values in sorted(samples.items()):
+        value = round(median(values), 2)
+
+        if len(path) == 1:
+            baseline[path[0]] = value
+        else:
+            baseline.setdefault(path[0], {})[path[1]] = value
+
+    return baseline
+
+
+def run(seed: int, num_keys: int, num_ops: int) -> Dict[str, Any]:
+    workload = generate_workload(seed, num_keys, num_ops)
+
+    latencies = replay(workload)
+    memory = {
+        target_cls.name: peak_memory(target_cls, workload)
+        for target_cls in (DictTarget, TrieTarget)
+    }
+
+    return summarize(latencies, memory)
+
+
+def report(seed: int, summary: Dict[str, Any]) -> None:
+    print('seed {}'.format(seed))
+    print('{:<12} {:>12} {:>12} {:>12} {:>12} {:>8} {:>8}'.format(
+        'op', 'dict p50', 'dict p99', 'trie p50', 'trie p99', 'x p50', 'x p99',
+    ))
+
+    for kind in OPS:
+        if kind not in summary['ratios']:
+            continue
+
+        d, t, r = summary['dict'][kind], summary['trie'][kind], summary['ratios'][kind]
+        print('{:<12} {:>10.1f}us {:>10.1f}us {:>10.1f}us {:>10.1f}us {:>8.1f} {:>8.1f}'.format(
+            kind,
+            d['p50'] / 1000, d['p99'] / 1000,
+            t['p50'] / 1000, t['p99'] / 1000,
+            r['p50'], r['p99'],
+        ))
+
+    print('{:<12} {:>10.1f}MiB {:>21.1f}MiB {:>17.1f}'.format(
+        'peak memory',
+        summary['dict']['peak_memory'] / 2 ** 20,
+        summary['trie']['peak_memory'] / 2 ** 20,
+        summary['ratios']['peak_memory'],
+    ))
+
+
+def main(argv: List[str]=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--runs', type=int, default=1)
+    parser.add_argument('--keys', type=int, default=10000)
+    parser.add_argument('--ops', type=int, default=5000)
+    parser.add_argument('--budget', default=DEFAULT_BUDGET)
+    parser.add_argument('--record', action='store_true')
+    args = parser.parse_args(argv)
+
+    with open(args.budget) as f:
+        budget = json.load(f)
+
+    seed = random.randrange(2 ** 32) if args.seed is None else args.seed
+    failed = False
+    summaries = []
+
+    for i in range(args.runs):
+        try:
+            summary = run(seed + i, args.keys, args.ops)
+        except MismatchError as e:
+            print('seed {}: {}'.format(seed + i, e))
+            failed = True
+            continue
+
+        report(seed + i, summary)
+        summaries.append(summary)
+
+        if args.record:
+            continue
+
+        for violation in check_budget(summary, budget):
+            print('seed {}: {}'.format(seed + i, violation))
+            failed = True
+
+    if args.record and not failed:
+        budget['baseline'] = record_baseline(summaries)
+
+        with open(args.budget, 'w') as f:
+            json.dump(budget, f, indent=4, sort_keys=True)
+            f.write('\n')
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1 +1,8 @@
 from .trie import *  # noqa: F401, F403
+from .interning import *  # noqa: F401, F403
+from .async_trie import *  # noqa: F401, F403
+from .db import *  # noqa: F401, F403
+from .journal import *  # noqa: F401, F403
+from .secure_trie import *  # noqa: F401, F403
+from .cursor import *  # noqa: F401, F403
+from .shared import *  # noqa: F401, F403
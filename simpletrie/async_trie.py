@@ -0,0 +1,222 @@
+from functools import partial
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Sequence,
+    TypeVar,
+)
+import abc
+import asyncio
+
+from .trie import (
+    BLANK_ROOT,
+    Branch,
+    Extension,
+    HashNode,
+    Leaf,
+    MissingNodeError,
+    Nibbles,
+    Node,
+    SimpleTrie,
+    commit_node,
+)
+from .utils import (
+    bytes_to_nibbles,
+)
+
+
+T = TypeVar('T')
+
+
+class AsyncNodeStore(metaclass=abc.ABCMeta):
+    """
+    An asynchronous key-value store which maps node hashes to node encodings.
+    """
+    __slots__ = tuple()
+
+    @abc.abstractmethod
+    async def get(self, key: bytes) -> bytes:  # pragma: no coverage
+        """
+        Returns the value stored under ``key``.  Raises ``KeyError`` if no
+        such value exists.
+        """
+        pass
+
+    @abc.abstractmethod
+    async def set(self, key: bytes, value: bytes) -> None:  # pragma: no coverage
+        """
+        Stores ``value`` under ``key``.
+        """
+        pass
+
+
+class AsyncSimpleTrie:
+    """
+    An asyncio facade for a ``SimpleTrie`` whose nodes are kept in an
+    asynchronous node store.  Before any trie operation, the nodes along the
+    paths of the keys involved are fetched concurrently from the store.  The
+    operation itself is then carried out by the underlying ``SimpleTrie`` and
+    has identical semantics.
+    """
+    __slots__ = ('store', '_trie', '_fetches')
+
+    def __init__(self,
+                 store: AsyncNodeStore,
+                 root_hash: bytes=None,
+                 cache_encodings: bool=True) -> None:
+        self.store = store
+        self._trie = SimpleTrie(root_hash=root_hash, cache_encodings=cache_encodings)
+
+        # Fetches which are in flight keyed by node hash
+        self._fetches = {}  # type: Dict[bytes, asyncio.Future]
+
+    async def _fetch(self, h: bytes) -> bytes:
+        try:
+            return await self.store.get(h)
+        except KeyError:
+            raise MissingNodeError('Node {} not found in store'.format(h.hex()))
+
+    def _fetch_done(self, h: bytes, fetch: asyncio.Future) -> None:
+        if self._fetches.get(h) is fetch:
+            del self._fetches[h]
+
+        # Callers which awaited the fetch see its result themselves, but mark
+        # it retrieved in case they were all cancelled
+        if not fetch.cancelled():
+            fetch.exception()
+
+    async def _resolve(self, node: HashNode) -> Node:
+        if node.is_resolved:
+            return node.node
+
+        # Coalesce concurrent fetches of the same node
+        try:
+            fetch = self._fetches[node.hash]
+        except KeyError:
+            fetch = asyncio.ensure_future(self._fetch(node.hash))
+            fetch.add_done_callback(partial(self._fetch_done, node.hash))
+            self._fetches[node.hash] = fetch
+
+        # Cancelling one caller should not cancel the fetch for the others
+        encoded = await asyncio.shield(fetch)
+
+        return node.resolve(encoded)
+
+    async def _prefetch(self, node: Node, keys: Sequence[Nibbles]) -> None:
+        """
+        Resolves any hash nodes under ``node`` along the paths of the sorted
+        ``keys``.  The children of a branch are resolved concurrently.
+        """
+        while isinstance(node, HashNode):
+            node = await self._resolve(node)
+
+        if isinstance(node, Leaf):
+            return
+
+        if isinstance(node, Extension):
+            i = len(node.key)
+            tails = [k[i:] for k in keys if k[:i] == node.key]
+
+            if tails:
+                await self._prefetch(node.node, tails)
+
+            return
+
+        groups = {}  # type: Dict[int, List[Nibbles]]
+        for k in keys:
+            if len(k) > 0 and node.nodes[k[0]] is not None:
+                groups.setdefault(k[0], []).append(k[1:])
+
+        await asyncio.gather(*(
+            self._prefetch(node.nodes[head], tails)
+            for head, tails in groups.items()
+        ))
+
+    async def _prefetch_keys(self, keys: Iterable[bytes]) -> None:
+        if self._trie._root is None:
+            return
+
+        await self._prefetch(
+            self._trie._root,
+            sorted(tuple(bytes_to_nibbles(k)) for k in keys),
+        )
+
+    async def _apply(self, keys: Sequence[bytes], op: Callable[[], T]) -> T:
+        """
+        Fetches the nodes along the paths of ``keys`` and returns the result of
+        the trie operation ``op``.
+        """
+        while True:
+            await self._prefetch_keys(keys)
+
+            try:
+                return op()
+            except MissingNodeError:
+                # Nodes were evicted after they were fetched.  Trie operations
+                # do not change the trie until they succeed, so fetch the
+                # nodes again and retry.
+                continue
+
+    async def get(self, key: bytes) -> bytes:
+        return await self._apply((key,), lambda: self._trie[key])
+
+    async def get_many(self, keys: Iterable[bytes], default: Any=None) -> List[Any]:
+        keys = list(keys)
+
+        return await self._apply(keys, lambda: self._trie.get_many(keys, default))
+
+    async def set(self, key: bytes, value: bytes) -> None:
+        def op() -> None:
+            self._trie[key] = value
+
+        await self._apply((key,), op)
+
+    async def delete(self, key: bytes) -> None:
+        def op() -> None:
+            del self._trie[key]
+
+        await self._apply((key,), op)
+
+    async def commit(self) -> bytes:
+        """
+        Writes any nodes which have not yet been committed to the store and
+        returns the hash of the root node.
+        """
+        root = self._trie._root
+        if root is None:
+            return BLANK_ROOT
+
+        # The committed hash nodes are not bound to the encodings gathered
+        # here so that they can be evicted and fetched again from the store
+        db = {}  # type: Dict[bytes, bytes]
+        committed = commit_node(root, db, self._trie.cache_encodings, bind=False)
+
+        await asyncio.gather(*(self.store.set(h, e) for h, e in db.items()))
+
+        # Only replace the root if no writes happened during the commit
+        if self._trie._root is root:
+            self._trie._root = committed
+
+        return committed.hash
+
+    def evict(self) -> None:
+        """
+        Drops all committed and fetched nodes, along with their cached
+        encodings, so that they are fetched again from the store on next use.
+        Operations which are in flight fetch any nodes they need again.
+        """
+        stack = [self._trie._root]
+
+        while stack:
+            n = stack.pop()
+            cls = type(n)
+
+            if cls is Branch:
+                stack.extend(n.nodes)
+            elif cls is Extension:
+                stack.append(n.node)
+            elif cls is HashNode and n.is_resolved:
+                n._drop()
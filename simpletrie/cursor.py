@@ -0,0 +1,303 @@
+from typing import (
+    List,
+    Optional,
+    Tuple,
+)
+
+from .trie import (
+    Branch,
+    Extension,
+    Leaf,
+    Nibbles,
+    Node,
+    SimpleTrie,
+)
+from .utils import (
+    bytes_to_nibbles,
+    nibbles_to_bytes,
+)
+
+
+# A node along the cursor's path, the index of the child at which the path
+# continues and the key prefix leading to the node.  For branches, an index of
+# -1 refers to the branch's own value.
+Frame = Tuple[Node, int, Nibbles]
+
+Item = Tuple[bytes, bytes]
+
+
+def _resolve(node: Node) -> Node:
+    while type(node) not in (Leaf, Extension, Branch):
+        node = node.node
+
+    return node
+
+
+class TrieCursor:
+    """
+    A cursor over the items of a ``SimpleTrie`` in key order.  The cursor is
+    pinned to the root of the trie at the time of its creation, so later
+    writes to the trie are not visible to it and do not invalidate it.
+
+    The cursor keeps the path from the root to its current item as a stack of
+    frames.  Moving to an adjacent item therefore only revisits the nodes
+    between the two items rather than descending again from the root.
+    """
+    __slots__ = ('root', '_stack', '_at_end')
+
+    def __init__(self, trie: SimpleTrie) -> None:
+        self.root = trie._root
+
+        self._stack = []  # type: List[Frame]
+
+        # Whether the cursor has moved past the last item (as opposed to
+        # before the first item) when not positioned on an item
+        self._at_end = False
+
+    @property
+    def is_positioned(self) -> bool:
+        return len(self._stack) > 0
+
+    @property
+    def item(self) -> Optional[Item]:
+        """
+        Returns the key and value of the current item or ``None`` if the
+        cursor is not positioned on an item.
+        """
+        if not self._stack:
+            return None
+
+        node, _, prefix = self._stack[-1]
+
+        if type(node) is Leaf:
+            return b''.join(nibbles_to_bytes(prefix + node.key)), node.value
+
+        return b''.join(nibbles_to_bytes(prefix)), node.value
+
+    def _descend_first(self, node: Node, prefix: Nibbles) -> Item:
+        while True:
+            node = _resolve(node)
+            cls = type(node)
+
+            if cls is Leaf:
+                self._stack.append((node, 0, prefix))
+                return self.item
+
+            if cls is Extension:
+                self._stack.append((node, 0, prefix))
+                prefix += node.key
+                node = node.node
+                continue
+
+            if node.value is not None:
+                self._stack.append((node, -1, prefix))
+                return self.item
+
+            i = next(i for i, n in enumerate(node.nodes) if n is not None)
+            self._stack.append((node, i, prefix))
+            prefix += (i,)
+            node = node.nodes[i]
+
+    def _descend_last(self, node: Node, prefix: Nibbles) -> Item:
+        while True:
+            node = _resolve(node)
+            cls = type(node)
+
+            if cls is Leaf:
+                self._stack.append((node, 0, prefix))
+                return self.item
+
+            if cls is Extension:
+                self._stack.append((node, 0, prefix))
+                prefix += node.key
+                node = node.node
+                continue
+
+            i = next((i for i in range(15, -1, -1) if node.nodes[i] is not None), -1)
+            self._stack.append((node, i, prefix))
+
+            if i == -1:
+                return self.item
+
+            prefix += (i,)
+            node = node.nodes[i]
+
+    def _advance(self, node: Node, i: int, prefix: Nibbles) -> Optional[Item]:
+        """
+        Moves to the first item following the subtree of child ``i`` of
+        ``node`` (or following ``node`` itself if it is not a branch), where
+        ``node`` has been popped from the stack.
+        """
+        while True:
+            if type(node) is Branch:
+                for j in range(i + 1, 16):
+                    if node.nodes[j] is not None:
+                        self._stack.append((node, j, prefix))
+                        return self._descend_first(node.nodes[j], prefix + (j,))
+
+            if not self._stack:
+                self._at_end = True
+                return None
+
+            node, i, prefix = self._stack.pop()
+
+    def _retreat(self, node: Node, i: int, prefix: Nibbles) -> Optional[Item]:
+        """
+        Moves to the last item preceding the subtree of child ``i`` of
+        ``node`` (or preceding ``node`` itself if it is not a branch), where
+        ``node`` has been popped from the stack.
+        """
+        while True:
+            if type(node) is Branch:
+                for j in range(i - 1, -1, -1):
+                    if node.nodes[j] is not None:
+                        self._stack.append((node, j, prefix))
+                        return self._descend_last(node.nodes[j], prefix + (j,))
+
+                if i >= 0 and node.value is not None:
+                    self._stack.append((node, -1, prefix))
+                    return self.item
+
+            if not self._stack:
+                self._at_end = False
+                return None
+
+            node, i, prefix = self._stack.pop()
+
+    def first(self) -> Optional[Item]:
+        """
+        Moves to the first item and returns it.
+        """
+        self._stack = []
+
+        if self.root is None:
+            self._at_end = True
+            return None
+
+        return self._descend_first(self.root, ())
+
+    def last(self) -> Optional[Item]:
+        """
+        Moves to the last item and returns it.
+        """
+        self._stack = []
+
+        if self.root is None:
+            self._at_end = False
+            return None
+
+        return self._descend_last(self.root, ())
+
+    def next(self) -> Optional[Item]:
+        """
+        Moves to the next item and returns it.  Returns ``None`` if there is no
+        next item.  An unpositioned cursor moves to the first item unless it
+        has moved past the last item.
+        """
+        if not self._stack:
+            if self._at_end:
+                return None
+
+            return self.first()
+
+        return self._advance(*self._stack.pop())
+
+    def prev(self) -> Optional[Item]:
+        """
+        Moves to the previous item and returns it.  Returns ``None`` if there
+        is no previous item.  An unpositioned cursor moves to the last item
+        unless it has moved before the first item.
+        """
+        if not self._stack:
+            if not self._at_end:
+                return None
+
+            return self.last()
+
+        return self._retreat(*self._stack.pop())
+
+    def seek(self, key: bytes) -> Optional[Item]:
+        """
+        Moves to the first item with a key greater than or equal to ``key`` and
+        returns it.  Returns ``None`` if there is no such item.
+        """
+        self._stack = []
+
+        if self.root is None:
+            self._at_end = True
+            return None
+
+        key = tuple(bytes_to_nibbles(key))
+        node = self.root
+        prefix = ()  # type: Nibbles
+
+        while True:
+            node = _resolve(node)
+            cls = type(node)
+
+            if cls is Leaf:
+                if prefix + node.key >= key:
+                    self._stack.append((node, 0, prefix))
+                    return self.item
+
+                return self._advance(node, 0, prefix)
+
+            if cls is Extension:
+                i = len(prefix)
+                segment = key[i:i + len(node.key)]
+
+                if node.key < segment:
+                    # All keys under this node precede ``key``
+                    return self._advance(node, 0, prefix)
+
+                self._stack.append((node, 0, prefix))
+                prefix += node.key
+
+                if node.key > segment:
+                    # All keys under this node follow ``key``
+                    return self._descend_first(node.node, prefix)
+
+                node = node.node
+                continue
+
+            if len(prefix) == len(key):
+                return self._descend_first(node, prefix)
+
+            head = key[len(prefix)]
+            if node.nodes[head] is None:
+                return self._advance(node, head, prefix)
+
+            self._stack.append((node, head, prefix))
+            prefix += (head,)
+            node = node.nodes[head]
+
+    def range(self, start: bytes=None, stop: bytes=None, limit: int=None) -> List[Item]:
+        """
+        Returns the items with keys in the range [``start``, ``stop``) up to a
+        maximum of ``limit`` items.  If ``start`` is ``None``, the range begins
+        after the current item so that a previous range may be resumed.  If
+        ``stop`` is ``None``, the range continues to the last item.  The cursor
+        is left on the last item returned.
+        """
+        items = []  # type: List[Item]
+
+        if limit is not None and limit <= 0:
+            return items
+
+        if start is None:
+            item = self.next()
+        else:
+            item = self.seek(start)
+
+        while item is not None:
+            if stop is not None and item[0] >= stop:
+                self.prev()
+                break
+
+            items.append(item)
+            if limit is not None and len(items) >= limit:
+                break
+
+            item = self.next()
+
+        return items
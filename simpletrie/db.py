@@ -0,0 +1,142 @@
+from typing import (
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    MutableMapping,
+    Set,
+)
+
+from .trie import (
+    Branch,
+    Extension,
+    HashNode,
+    Node,
+    decode_node,
+)
+
+
+def child_hashes(encoded: bytes) -> List[bytes]:
+    """
+    Returns the hashes of the nodes referred to by hash from the encoded node
+    ``encoded``, including those referred to from any embedded nodes.
+    """
+    hashes = []
+    stack = [decode_node(encoded)]  # type: List[Node]
+
+    while stack:
+        node = stack.pop()
+
+        if isinstance(node, HashNode):
+            hashes.append(node.hash)
+        elif isinstance(node, Extension):
+            stack.append(node.node)
+        elif isinstance(node, Branch):
+            stack.extend(n for n in node.nodes if n is not None)
+
+    return hashes
+
+
+class RefCountedDB(MutableMapping):
+    """
+    A node database which counts the references to each node from other
+    nodes.  Reference counts are maintained as nodes are written during
+    ``SimpleTrie.commit``.  Since a commit only writes the nodes along
+    modified paths, the cost of maintaining counts is proportional to the
+    size of the modification.
+
+    Nodes with no references are the roots of committed tries (or orphans).
+    ``prune`` deletes those roots which are not retained along with any nodes
+    which are no longer reachable from the retained roots.
+    """
+    def __init__(self,
+                 db: MutableMapping[bytes, bytes]=None,
+                 refcounts: MutableMapping[bytes, int]=None) -> None:
+        self.db = {} if db is None else db
+        self.refcounts = {} if refcounts is None else refcounts
+
+        # Nodes which have no references
+        self._unreferenced = {
+            k for k, count in self.refcounts.items() if count == 0
+        }  # type: Set[bytes]
+
+        # Nodes awaiting deletion by ``prune`` in the order they were found
+        self._pending = {}  # type: Dict[bytes, None]
+
+    def __getitem__(self, key: bytes) -> bytes:
+        return self.db[key]
+
+    def __setitem__(self, key: bytes, encoded: bytes) -> None:
+        if key in self.refcounts:
+            # Node was written again by a new commit and should survive any
+            # prune which is in progress
+            self._pending.pop(key, None)
+            return
+
+        self.db[key] = encoded
+        self.refcounts[key] = 0
+        self._unreferenced.add(key)
+
+        for h in child_hashes(encoded):
+            self._incref(h)
+
+    def __delitem__(self, key: bytes) -> None:
+        """
+        Deletes a node without updating the reference counts of its children.
+        """
+        del self.db[key]
+        del self.refcounts[key]
+        self._unreferenced.discard(key)
+        self._pending.pop(key, None)
+
+    def __iter__(self) -> Iterator[bytes]:
+        return iter(self.db)
+
+    def __len__(self) -> int:
+        return len(self.db)
+
+    def _incref(self, key: bytes) -> None:
+        count = self.refcounts[key]
+        if count == 0:
+            self._unreferenced.discard(key)
+
+        self.refcounts[key] = count + 1
+
+    def prune(self, keep_roots: Iterable[bytes], batch_size: int=None) -> int:
+        """
+        Deletes nodes which are not reachable from the roots ``keep_roots``.
+        The roots of any tries which are still in use must be retained.  At
+        most ``batch_size`` nodes are examined per call so that pruning may be
+        interleaved with other work.  Returns the number of nodes which await
+        deletion; pruning is complete when this is zero.
+        """
+        keep_roots = set(keep_roots)
+
+        for h in self._unreferenced - keep_roots:
+            self._pending[h] = None
+        for h in keep_roots:
+            self._pending.pop(h, None)
+
+        examined = 0
+        while self._pending and (batch_size is None or examined < batch_size):
+            h = next(iter(self._pending))
+            del self._pending[h]
+            examined += 1
+
+            if self.refcounts.get(h) != 0 or h in keep_roots:
+                # Node was referenced again since it was found
+                continue
+
+            encoded = self.db[h]
+            del self[h]
+
+            for child in child_hashes(encoded):
+                count = self.refcounts[child] - 1
+                self.refcounts[child] = count
+
+                if count == 0:
+                    self._unreferenced.add(child)
+                    if child not in keep_roots:
+                        self._pending[child] = None
+
+        return len(self._pending)
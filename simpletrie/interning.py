@@ -0,0 +1,115 @@
+from sys import getrefcount
+from typing import (
+    Any,
+    Dict,
+    Hashable,
+    List,
+    Tuple,
+    TypeVar,
+)
+
+
+T = TypeVar('T', bound=Hashable)
+
+
+def _refcounts(pool: Dict[Any, Any]) -> List[Tuple[Any, int]]:
+    return [(k, getrefcount(k)) for k in pool]
+
+
+def _unused_refcount() -> int:
+    """
+    Returns the reference count reported by ``_refcounts`` for an entry which
+    is referred to only by its pool.
+    """
+    pool = {}  # type: Dict[Any, Any]
+    obj = (object(),)
+    pool[obj] = obj
+    del obj
+
+    (_, count), = _refcounts(pool)
+
+    return count
+
+
+_UNUSED_REFCOUNT = _unused_refcount()
+
+
+class InternPool:
+    """
+    A pool of canonical instances of equal immutable objects, such as the
+    values and key segments of trie nodes.  Interning an object returns the
+    pooled instance equal to it so that equal objects are stored only once.
+
+    Node keys longer than ``max_key_length`` are not interned since long keys,
+    such as those of leaves in tries keyed by hashes, rarely repeat.
+
+    Bytes and tuples cannot be weakly referenced, so the pool holds strong
+    references to its entries.  Entries which are referred to only by the
+    pool are removed by ``purge``, which is run whenever the pool has doubled
+    in size since the last purge.
+    """
+    __slots__ = ('_pool', 'max_key_length', 'min_purge_size', '_purge_size')
+
+    def __init__(self, max_key_length: int=16, min_purge_size: int=1024) -> None:
+        self._pool = {}  # type: Dict[Any, Any]
+
+        self.max_key_length = max_key_length
+        self.min_purge_size = min_purge_size
+        self._purge_size = min_purge_size
+
+    def intern(self, obj: T) -> T:
+        """
+        Returns the pooled instance equal to ``obj``, adding ``obj`` to the
+        pool if there is none.
+        """
+        pool = self._pool
+
+        try:
+            return pool[obj]
+        except KeyError:
+            pass
+
+        pool[obj] = obj
+
+        if len(pool) >= self._purge_size:
+            self.purge()
+
+        return obj
+
+    def intern_key(self, key: Tuple[int, ...]) -> Tuple[int, ...]:
+        """
+        Interns the node key ``key`` unless it is longer than
+        ``max_key_length``.
+        """
+        if len(key) > self.max_key_length:
+            return key
+
+        return self.intern(key)
+
+    def purge(self) -> int:
+        """
+        Removes any entries which are referred to only by the pool and returns
+        the number of entries removed.
+        """
+        pool = self._pool
+
+        unused = [k for k, count in _refcounts(pool) if count <= _UNUSED_REFCOUNT]
+        for k in unused:
+            del pool[k]
+
+        self._purge_size = max(2 * len(pool), self.min_purge_size)
+
+        return len(unused)
+
+    def __contains__(self, obj: Any) -> bool:
+        return obj in self._pool
+
+    def __len__(self) -> int:
+        return len(self._pool)
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        """
+        Pools are pickled without their entries, which are pooled again as
+        they are interned.
+        """
+        return type(self), (self.max_key_length, self.min_purge_size)
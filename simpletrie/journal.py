@@ -0,0 +1,257 @@
+from typing import (
+    Any,
+    Iterable,
+    List,
+    MutableMapping,
+    Tuple,
+)
+import os
+import struct
+import threading
+import time
+import zlib
+
+from .trie import (
+    BLANK_ROOT,
+    SimpleTrie,
+)
+
+
+_JOURNAL_MAGIC = b'STJ\x01'
+
+_SET = 1
+_DELETE = 2
+
+_record_header = struct.Struct('>BII')
+_checksum = struct.Struct('>I')
+
+
+def _encode_record(op: int, key: bytes, value: bytes=b'') -> bytes:
+    body = _record_header.pack(op, len(key), len(value)) + key + value
+
+    return body + _checksum.pack(zlib.crc32(body))
+
+
+def _decode_records(data: bytes, start: int) -> Tuple[List[Tuple[int, bytes, bytes]], int]:
+    """
+    Decodes the journal records in ``data`` beginning at offset ``start``.
+    Decoding stops at the first incomplete or corrupt record, as left by a
+    crash during an append.  Returns the decoded records and the offset of the
+    end of the last intact record.
+    """
+    records = []
+    i = start
+
+    while i + _record_header.size <= len(data):
+        op, key_len, value_len = _record_header.unpack_from(data, i)
+
+        body_end = i + _record_header.size + key_len + value_len
+        end = body_end + _checksum.size
+        if end > len(data) or op not in (_SET, _DELETE):
+            break
+
+        checksum, = _checksum.unpack_from(data, body_end)
+        if checksum != zlib.crc32(data[i:body_end]):
+            break
+
+        key_start = i + _record_header.size
+        records.append((
+            op,
+            data[key_start:key_start + key_len],
+            data[key_start + key_len:body_end],
+        ))
+        i = end
+
+    return records, i
+
+
+class JournaledTrie:
+    """
+    A ``SimpleTrie`` whose writes are recorded in an append-only journal file
+    at ``path`` so that they survive a crash.  Journal writes are grouped:
+    the journal is synced to disk once ``sync_every`` writes are pending or
+    at most ``sync_interval`` seconds after the first pending write, whichever
+    comes first.  A flusher thread syncs pending writes when the interval
+    passes even if no further writes arrive, until the journaled trie is
+    closed.  Only synced writes are guaranteed to be recovered.
+
+    The journal begins with the root hash of the last checkpoint.  Opening a
+    journaled trie replays the journal on top of that root in ``db``.  A
+    checkpoint commits the trie to ``db`` and truncates the journal.
+    """
+    def __init__(self,
+                 path: str,
+                 db: MutableMapping[bytes, bytes],
+                 sync_every: int=100,
+                 sync_interval: float=0.01) -> None:
+        self.path = path
+        self.db = db
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+
+        if not os.path.exists(path):
+            self._write_journal(BLANK_ROOT)
+
+        self.trie = self._recover()
+
+        self._file = open(path, 'ab')
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+        # Guards the journal file against syncs from the flusher thread and
+        # wakes the flusher when writes become pending
+        self._cond = threading.Condition()
+        self._flusher = threading.Thread(target=self._run_flusher, daemon=True)
+        self._flusher.start()
+
+    def _write_journal(self, root_hash: bytes) -> None:
+        """
+        Atomically replaces the journal with an empty journal which begins at
+        the root ``root_hash``.
+        """
+        tmp_path = self.path + '.tmp'
+
+        with open(tmp_path, 'wb') as f:
+            f.write(_JOURNAL_MAGIC + root_hash)
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(tmp_path, self.path)
+        _fsync_dir(os.path.dirname(os.path.abspath(self.path)))
+
+    def _recover(self) -> SimpleTrie:
+        with open(self.path, 'rb') as f:
+            data = f.read()
+
+        header_size = len(_JOURNAL_MAGIC) + 32
+        if len(data) < header_size or not data.startswith(_JOURNAL_MAGIC):
+            raise ValueError('Invalid journal header in {}'.format(self.path))
+
+        trie = SimpleTrie(self.db, data[len(_JOURNAL_MAGIC):header_size])
+
+        records, end = _decode_records(data, header_size)
+        for op, key, value in records:
+            if op == _SET:
+                trie[key] = value
+            else:
+                del trie[key]
+
+        if end < len(data):
+            # Discard any partial record left by a crash so that new records
+            # are appended after the last intact one
+            with open(self.path, 'r+b') as f:
+                f.truncate(end)
+                f.flush()
+                os.fsync(f.fileno())
+
+        return trie
+
+    def _append(self, record: bytes) -> None:
+        with self._cond:
+            self._file.write(record)
+            self._unsynced += 1
+
+            if (
+                self._unsynced >= self.sync_every or
+                time.monotonic() - self._last_sync >= self.sync_interval
+            ):
+                self._sync()
+            elif self._unsynced == 1:
+                self._cond.notify()
+
+    def _run_flusher(self) -> None:
+        """
+        Syncs pending writes once ``sync_interval`` seconds have passed since
+        the last sync.  Runs until the journal is closed.
+        """
+        with self._cond:
+            while not self._file.closed:
+                if not self._unsynced:
+                    self._cond.wait()
+                    continue
+
+                remaining = self._last_sync + self.sync_interval - time.monotonic()
+                if remaining > 0:
+                    self._cond.wait(remaining)
+                else:
+                    self._sync()
+
+    def _sync(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def sync(self) -> None:
+        """
+        Syncs any pending journal writes to disk.
+        """
+        with self._cond:
+            self._sync()
+
+    def checkpoint(self) -> bytes:
+        """
+        Commits the trie to the database and truncates the journal.  Returns
+        the root hash of the trie.
+        """
+        root_hash = self.trie.commit()
+
+        with self._cond:
+            self._file.close()
+            self._write_journal(root_hash)
+            self._file = open(self.path, 'ab')
+
+            self._unsynced = 0
+            self._last_sync = time.monotonic()
+
+        return root_hash
+
+    def close(self) -> None:
+        """
+        Syncs any pending journal writes and closes the journal.
+        """
+        with self._cond:
+            if not self._file.closed:
+                self._sync()
+                self._file.close()
+
+            self._cond.notify()
+
+        self._flusher.join()
+
+    def __enter__(self) -> 'JournaledTrie':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def __getitem__(self, key: bytes) -> bytes:
+        return self.trie[key]
+
+    def get_many(self, keys: Iterable[bytes], default: Any=None) -> List[Any]:
+        return self.trie.get_many(keys, default)
+
+    def __setitem__(self, key: bytes, value: bytes) -> None:
+        self.trie[key] = value
+        self._append(_encode_record(_SET, key, value))
+
+    def __delitem__(self, key: bytes) -> None:
+        del self.trie[key]
+        self._append(_encode_record(_DELETE, key))
+
+    def __len__(self) -> int:
+        return len(self.trie)
+
+
+def _fsync_dir(path: str) -> None:
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:  # pragma: no coverage
+        # Directories cannot be opened on some platforms
+        return
+
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
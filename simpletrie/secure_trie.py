@@ -0,0 +1,276 @@
+from collections import OrderedDict
+from typing import (
+    Any,
+    Iterable,
+    Iterator,
+    List,
+    MutableMapping,
+    Optional,
+    Tuple,
+)
+
+from eth_hash.auto import keccak
+
+from .interning import (
+    InternPool,
+)
+from .trie import (
+    Branch,
+    Extension,
+    Leaf,
+    Nibbles,
+    Node,
+    SimpleTrie,
+    Transaction,
+    delete_key,
+    insert_key,
+)
+from .utils import (
+    bytes_to_nibble_bytes,
+)
+
+
+def hash_to_nibbles(h: bytes) -> Nibbles:
+    """
+    Converts the hash ``h`` into its nibbles.  Equivalent to
+    ``tuple(bytes_to_nibbles(h))`` but avoids a generator step per nibble.
+    """
+    return tuple(bytes_to_nibble_bytes(h))
+
+
+def _get_fixed(node: Node, key: Nibbles) -> bytes:
+    """
+    Returns the value mapped to by ``key`` under ``node`` where all keys under
+    ``node`` have the same length as ``key``.  Since no key is then a prefix
+    of another, branches hold no values and a lookup always ends at a leaf.
+    """
+    i = 0
+
+    while True:
+        cls = type(node)
+
+        if cls is Branch:
+            node = node.nodes[key[i]]
+            if node is None:
+                raise KeyError('Key not found')
+            i += 1
+
+        elif cls is Leaf:
+            if node.key == key[i:]:
+                return node.value
+            raise KeyError('Key not found')
+
+        elif cls is Extension:
+            j = i + len(node.key)
+            if key[i:j] != node.key:
+                raise KeyError('Key not found')
+            node = node.node
+            i = j
+
+        else:
+            node = node.node
+
+
+class SecureTrie(SimpleTrie):
+    """
+    A trie which stores each value under the keccak hash of its key rather
+    than the key itself, as in Ethereum state tries.  All paths therefore have
+    a fixed length of 64 nibbles.
+
+    Since keys cannot be recovered from their hashes, up to ``max_preimages``
+    of the most recently written keys are kept so that ``items`` can yield
+    them.  If ``max_preimages`` is ``None``, all keys are kept.  Keys whose
+    preimages are not kept are yielded as their hashes.
+
+    Since hashing does not preserve key prefixes, ``delete_prefix`` and
+    ``graft`` are not supported.  A ``TrieCursor`` over a secure trie orders,
+    seeks and yields items by their hashed keys, as ``hashed_items`` does.
+    """
+    __slots__ = ('preimages', 'max_preimages')
+
+    def __init__(self,
+                 db: MutableMapping[bytes, bytes]=None,
+                 root_hash: bytes=None,
+                 cache_encodings: bool=True,
+                 intern_pool: InternPool=None,
+                 max_preimages: int=0) -> None:
+        super().__init__(db, root_hash, cache_encodings, intern_pool)
+
+        self.preimages = OrderedDict()  # type: OrderedDict[bytes, bytes]
+        self.max_preimages = max_preimages
+
+    @classmethod
+    def from_items(cls, items: Iterable[Tuple[bytes, bytes]], workers: int=None) -> 'SecureTrie':
+        """
+        Builds a trie from the key-value pairs ``items`` as with
+        ``SimpleTrie.from_items``.  Keys are hashed before they are
+        partitioned among any ``workers``.  No preimages are kept.
+        """
+        hashed = SimpleTrie.from_items(
+            ((keccak(k), v) for k, v in items),
+            workers,
+        )
+
+        t = cls()
+        t._root = hashed._root
+
+        return t
+
+    def __getstate__(self) -> Tuple[Any, ...]:
+        return super().__getstate__() + (self.preimages, self.max_preimages)
+
+    def __setstate__(self, state: Tuple[Any, ...]) -> None:
+        super().__setstate__(state[:-2])
+        self.preimages, self.max_preimages = state[-2:]
+
+    def _remember(self, h: bytes, key: bytes) -> None:
+        if self.max_preimages == 0:
+            return
+
+        self.preimages[h] = key
+        self.preimages.move_to_end(h)
+
+        if self.max_preimages is not None and len(self.preimages) > self.max_preimages:
+            self.preimages.popitem(last=False)
+
+    def __getitem__(self, key: bytes) -> bytes:
+        if self._root is None:
+            raise KeyError(repr(key))
+
+        try:
+            return _get_fixed(self._root, hash_to_nibbles(keccak(key)))
+        except KeyError:
+            raise KeyError(repr(key))
+
+    def get_many(self, keys: Iterable[bytes], default: Any=None) -> List[Any]:
+        # Hash all keys up front
+        hashes = list(map(keccak, keys))
+
+        return self._get_many(list(map(hash_to_nibbles, hashes)), default)
+
+    def __setitem__(self, key: bytes, value: bytes) -> None:
+        h = keccak(key)
+        pool = self.intern_pool
+
+        if pool is None:
+            self._root = insert_key(self._root, hash_to_nibbles(h), value)
+        else:
+            self._root = insert_key(
+                self._root,
+                hash_to_nibbles(h),
+                pool.intern(value),
+                pool.intern_key,
+            )
+        self._remember(h, key)
+
+    def __delitem__(self, key: bytes) -> None:
+        if self._root is None:
+            raise KeyError(repr(key))
+
+        h = keccak(key)
+
+        try:
+            self._root = delete_key(self._root, hash_to_nibbles(h))
+        except KeyError:
+            raise KeyError(repr(key))
+
+        self.preimages.pop(h, None)
+
+    def update(self, items: Iterable[Tuple[bytes, bytes]]) -> None:
+        items = list(items)
+
+        # Hash all keys up front
+        hashes = list(map(keccak, (k for k, _ in items)))
+
+        pool = self.intern_pool
+
+        root = self._root
+        for h, (key, value) in zip(hashes, items):
+            if pool is None:
+                root = insert_key(root, hash_to_nibbles(h), value)
+            else:
+                root = insert_key(root, hash_to_nibbles(h), pool.intern(value), pool.intern_key)
+            self._remember(h, key)
+
+        self._root = root
+
+    def delete_prefix(self, prefix: bytes) -> None:
+        raise TypeError('Secure tries do not preserve key prefixes')
+
+    def graft(self, prefix: bytes, trie: SimpleTrie) -> None:
+        raise TypeError('Secure tries do not preserve key prefixes')
+
+    def transaction(self) -> 'SecureTransaction':
+        return SecureTransaction(self)
+
+    def hashed_items(self) -> Iterator[Tuple[bytes, bytes]]:
+        """
+        Yields the hashed keys and values in this trie in hashed key order.
+        """
+        return super().items()
+
+    def items(self) -> Iterator[Tuple[bytes, bytes]]:
+        """
+        Yields the keys and values in this trie in hashed key order.  Any key
+        whose preimage is not kept is yielded as its hash.
+        """
+        preimages = self.preimages
+
+        for h, value in self.hashed_items():
+            yield preimages.get(h, h), value
+
+
+class SecureTransaction(Transaction):
+    """
+    A transaction on a ``SecureTrie``.  Keys are hashed as by the trie and
+    changes to the trie's preimages are applied when the transaction is
+    frozen.
+    """
+    __slots__ = ('_preimages',)
+
+    def __init__(self, trie: SecureTrie) -> None:
+        super().__init__(trie)
+
+        self._preimages = []  # type: List[Tuple[bytes, Optional[bytes]]]
+
+    def freeze(self) -> None:
+        super().freeze()
+
+        trie = self.trie
+        for h, key in self._preimages:
+            if key is None:
+                trie.preimages.pop(h, None)
+            else:
+                trie._remember(h, key)
+
+        self._preimages = []
+
+    def discard(self) -> None:
+        super().discard()
+
+        self._preimages = []
+
+    def __getitem__(self, key: bytes) -> bytes:
+        if self._root is None:
+            raise KeyError(repr(key))
+
+        try:
+            return _get_fixed(self._root, hash_to_nibbles(keccak(key)))
+        except KeyError:
+            raise KeyError(repr(key))
+
+    def __setitem__(self, key: bytes, value: bytes) -> None:
+        h = keccak(key)
+
+        self.insert(hash_to_nibbles(h), value)
+        self._preimages.append((h, key))
+
+    def __delitem__(self, key: bytes) -> None:
+        h = keccak(key)
+
+        try:
+            self.delete(hash_to_nibbles(h))
+        except KeyError:
+            raise KeyError(repr(key))
+
+        self._preimages.append((h, None))
@@ -0,0 +1,428 @@
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import (
+    Any,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+import os
+import struct
+import sys
+
+from .trie import (
+    FLAT_BRANCH,
+    FLAT_EXTENSION,
+    FLAT_HASH,
+    FLAT_LEAF,
+    Branch,
+    Extension,
+    HashNode,
+    SimpleTrie,
+    flatten_node,
+)
+from .utils import (
+    bytes_to_nibble_bytes,
+    nibble_bytes_to_bytes,
+)
+
+
+# An image of a trie is a header followed by its nodes.  Children precede
+# their parents and are referred to by their offset in the image, with an
+# offset of zero referring to no node.
+#
+#   header:    magic, image size, root offset, number of items
+#   leaf:      tag, key length, value length, key, value
+#   extension: tag, key length, child offset, key
+#   branch:    tag, 16 child offsets, value length, value
+#
+# Keys are stored as one byte per nibble.  A branch with no value has a value
+# length of ``_NO_VALUE``.
+_IMAGE_MAGIC = b'STI\x01'
+_HEADER = struct.Struct('<4sQQQ')
+_LEAF = struct.Struct('<BII')
+_EXTENSION = struct.Struct('<BIQ')
+_BRANCH = struct.Struct('<B16QI')
+_NO_VALUE = 0xffffffff
+
+_TAG_LEAF = 0
+_TAG_EXTENSION = 1
+_TAG_BRANCH = 2
+
+# The control segment of a published trie holds the current generation
+_CONTROL = struct.Struct('<Q')
+
+# Before Python 3.13, attaching to a segment registers it with the attaching
+# process's resource tracker, which unlinks it when the process exits
+_ATTACH_REGISTERS = os.name == 'posix' and sys.version_info < (3, 13)
+
+
+def _attach(name: str) -> SharedMemory:
+    # Readers should not unlink segments owned by the writer on exit
+    if not _ATTACH_REGISTERS:
+        return SharedMemory(name, track=False)
+
+    shm = SharedMemory(name)
+    resource_tracker.unregister(shm._name, 'shared_memory')
+
+    return shm
+
+
+def _unlink(shm: SharedMemory) -> None:
+    if _ATTACH_REGISTERS:
+        # A reader which shares this process's resource tracker, such as a
+        # reader in the same process or in a child process, unregisters the
+        # segment when attaching to it.  Register it again so that unlinking
+        # does not unregister a segment which the tracker does not know of.
+        resource_tracker.register(shm._name, 'shared_memory')
+
+    shm.unlink()
+
+
+def build_image(trie: SimpleTrie) -> bytearray:
+    """
+    Returns an image of the nodes of ``trie`` from which the trie can be read
+    without creating node objects.  Any nodes which are not yet resolved are
+    loaded from the trie's database.
+    """
+    image = bytearray(_HEADER.size)
+
+    if trie._root is None:
+        _HEADER.pack_into(image, 0, _IMAGE_MAGIC, len(image), 0, 0)
+        return image
+
+    # Hash nodes are stored as their referent nodes
+    stack = [trie._root]
+    while stack:
+        n = stack.pop()
+        if isinstance(n, HashNode):
+            n = n.node
+
+        cls = type(n)
+        if cls is Branch:
+            stack.extend(c for c in n.nodes if c is not None)
+        elif cls is Extension:
+            stack.append(n.node)
+
+    flat = flatten_node(trie._root)
+    offsets = [0] * len(flat)
+
+    for i, (tag, a, b) in enumerate(flat):
+        if tag == FLAT_HASH:
+            offsets[i] = offsets[b]
+            continue
+
+        offsets[i] = len(image)
+
+        if tag == FLAT_LEAF:
+            image += _LEAF.pack(_TAG_LEAF, len(a), len(b))
+            image += a
+            image += b
+
+        elif tag == FLAT_EXTENSION:
+            image += _EXTENSION.pack(_TAG_EXTENSION, len(a), offsets[b])
+            image += a
+
+        elif tag == FLAT_BRANCH:
+            image += _BRANCH.pack(
+                _TAG_BRANCH,
+                *(0 if j is None else offsets[j] for j in a),
+                _NO_VALUE if b is None else len(b)
+            )
+            if b is not None:
+                image += b
+
+    _HEADER.pack_into(image, 0, _IMAGE_MAGIC, len(image), offsets[-1], len(trie))
+
+    return image
+
+
+class SharedTrieWriter:
+    """
+    Publishes images of a trie in shared memory for ``SharedTrieReader``
+    instances in other processes.  Each published image is a new generation
+    in its own segment.  A small control segment named ``name`` holds the
+    current generation, so publishing a generation is a single write which
+    readers see either before or after.
+
+    Only the current generation is kept.  Readers which are attached to an
+    earlier generation can go on reading it until they refresh.
+    """
+    __slots__ = ('_control', '_image', 'generation')
+
+    def __init__(self, name: str=None) -> None:
+        self._control = SharedMemory(name, create=True, size=_CONTROL.size)
+        _CONTROL.pack_into(self._control.buf, 0, 0)
+
+        self._image = None  # type: Optional[SharedMemory]
+        self.generation = 0
+
+    @property
+    def name(self) -> str:
+        return self._control.name
+
+    def publish(self, trie: SimpleTrie) -> int:
+        """
+        Publishes an image of ``trie`` as a new generation and returns the
+        number of that generation.
+        """
+        image = build_image(trie)
+
+        generation = self.generation + 1
+        shm = SharedMemory(
+            '{}_{}'.format(self.name, generation),
+            create=True,
+            size=len(image),
+        )
+        shm.buf[:len(image)] = image
+
+        _CONTROL.pack_into(self._control.buf, 0, generation)
+
+        if self._image is not None:
+            self._image.close()
+            _unlink(self._image)
+
+        self._image = shm
+        self.generation = generation
+
+        return generation
+
+    def close(self) -> None:
+        """
+        Unlinks the control segment and the current generation.
+        """
+        for shm in (self._image, self._control):
+            if shm is not None:
+                shm.close()
+                _unlink(shm)
+
+        self._image = None
+
+    def __enter__(self) -> 'SharedTrieWriter':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+class SharedTrieReader:
+    """
+    A read-only view of the trie published by the ``SharedTrieWriter`` named
+    ``name``.  Lookups are served directly from the shared image.  A reader
+    stays on the generation which was current when it was created or last
+    refreshed.
+    """
+    __slots__ = ('name', 'generation', '_control', '_image', '_buf', '_root', '_len')
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.generation = 0
+
+        self._control = _attach(name)
+        self._image = None  # type: Optional[SharedMemory]
+        self._buf = None  # type: Optional[memoryview]
+        self._root = 0
+        self._len = 0
+
+        self.refresh()
+
+    def refresh(self) -> int:
+        """
+        Switches to the current generation and returns its number.
+        """
+        while True:
+            generation, = _CONTROL.unpack_from(self._control.buf, 0)
+            if generation == self.generation:
+                return generation
+
+            try:
+                shm = _attach('{}_{}'.format(self.name, generation))
+            except FileNotFoundError:
+                # The generation was replaced before it could be attached
+                continue
+
+            break
+
+        magic, size, root, length = _HEADER.unpack_from(shm.buf, 0)
+        if magic != _IMAGE_MAGIC:
+            shm.close()
+            raise ValueError('Segment does not hold a trie image')
+
+        self._release()
+
+        self._image = shm
+        self._buf = shm.buf[:size]
+        self._root = root
+        self._len = length
+        self.generation = generation
+
+        return generation
+
+    def _release(self) -> None:
+        if self._image is not None:
+            self._buf.release()
+            self._image.close()
+
+        self._image = None
+        self._buf = None
+        self._root = 0
+        self._len = 0
+
+    def close(self) -> None:
+        self._release()
+        self._control.close()
+
+    def __enter__(self) -> 'SharedTrieReader':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def _get(self, key: bytes) -> Optional[bytes]:
+        buf = self._buf
+        off = self._root
+        i = 0
+
+        while off:
+            tag = buf[off]
+
+            if tag == _TAG_BRANCH:
+                if i == len(key):
+                    length, = struct.unpack_from('<I', buf, off + 129)
+                    if length == _NO_VALUE:
+                        return None
+
+                    start = off + _BRANCH.size
+                    return bytes(buf[start:start + length])
+
+                off, = struct.unpack_from('<Q', buf, off + 1 + 8 * key[i])
+                i += 1
+
+            elif tag == _TAG_LEAF:
+                _, key_length, length = _LEAF.unpack_from(buf, off)
+                if key_length != len(key) - i:
+                    return None
+
+                start = off + _LEAF.size
+                if buf[start:start + key_length] != key[i:]:
+                    return None
+
+                start += key_length
+                return bytes(buf[start:start + length])
+
+            else:
+                _, key_length, child = _EXTENSION.unpack_from(buf, off)
+
+                start = off + _EXTENSION.size
+                if buf[start:start + key_length] != key[i:i + key_length]:
+                    return None
+
+                off = child
+                i += key_length
+
+        return None
+
+    def __getitem__(self, key: bytes) -> bytes:
+        value = self._get(bytes_to_nibble_bytes(key))
+        if value is None:
+            raise KeyError(repr(key))
+
+        return value
+
+    def get_many(self, keys: Iterable[bytes], default: Any=None) -> List[Any]:
+        """
+        Returns a list of the values mapped to by each of ``keys`` in the same
+        order as ``keys``.  Any key which is not found is mapped to
+        ``default``.
+        """
+        values = []
+
+        for key in keys:
+            value = self._get(bytes_to_nibble_bytes(key))
+            values.append(default if value is None else value)
+
+        return values
+
+    def __len__(self) -> int:
+        return self._len
+
+    def items(self, prefix: bytes=b'') -> Iterator[Tuple[bytes, bytes]]:
+        """
+        Yields the keys and values of all keys which begin with ``prefix`` in
+        key order.
+        """
+        buf = self._buf
+        key = bytes_to_nibble_bytes(prefix)
+        off = self._root
+        path = b''
+
+        # Find the node under which all keys begin with the prefix
+        while off and len(path) < len(key):
+            tag = buf[off]
+            i = len(path)
+
+            if tag == _TAG_BRANCH:
+                off, = struct.unpack_from('<Q', buf, off + 1 + 8 * key[i])
+                path += key[i:i + 1]
+
+            elif tag == _TAG_LEAF:
+                _, key_length, _ = _LEAF.unpack_from(buf, off)
+
+                start = off + _LEAF.size
+                if not bytes(buf[start:start + key_length]).startswith(key[i:]):
+                    return
+
+                break
+
+            else:
+                _, key_length, child = _EXTENSION.unpack_from(buf, off)
+
+                start = off + _EXTENSION.size
+                segment = bytes(buf[start:start + key_length])
+                n = min(key_length, len(key) - i)
+                if segment[:n] != key[i:i + n]:
+                    return
+
+                off = child
+                path += segment
+
+        stack = [(off, path)]  # type: List[Tuple[int, bytes]]
+
+        while stack:
+            off, path = stack.pop()
+            if not off:
+                continue
+
+            tag = buf[off]
+
+            if tag == _TAG_BRANCH:
+                unpacked = _BRANCH.unpack_from(buf, off)
+
+                stack.extend(
+                    (unpacked[1 + j], path + bytes((j,)))
+                    for j in range(15, -1, -1)
+                )
+
+                length = unpacked[17]
+                if length != _NO_VALUE:
+                    start = off + _BRANCH.size
+                    yield nibble_bytes_to_bytes(path), bytes(buf[start:start + length])
+
+            elif tag == _TAG_LEAF:
+                _, key_length, length = _LEAF.unpack_from(buf, off)
+
+                start = off + _LEAF.size
+                end = start + key_length
+                yield nibble_bytes_to_bytes(path + buf[start:end]), bytes(buf[end:end + length])
+
+            else:
+                _, key_length, child = _EXTENSION.unpack_from(buf, off)
+
+                start = off + _EXTENSION.size
+                stack.append((child, path + buf[start:start + key_length]))
+
+    def __iter__(self) -> Iterator[bytes]:
+        for key, _ in self.items():
+            yield key
@@ -1,21 +1,50 @@
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
 from typing import (
     Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
     List,
+    Mapping,
+    MutableMapping,
     Optional,
+    Sequence,
     Union,
     Tuple,
 )
 import abc
+import gc
 
+from eth_hash.auto import keccak
+
+from .interning import (
+    InternPool,
+)
 from .utils import (
     bytes_to_nibbles,
+    decode_hex_prefix,
+    hex_prefix,
     indent,
+    nibbles_to_bytes,
     prefix_length,
+    rlp_decode,
+    rlp_encode,
 )
 
 
 Nibbles = Tuple[int, ...]
 
+BLANK_ROOT = keccak(rlp_encode(b''))
+
+
+class MissingNodeError(Exception):
+    """
+    Raised when a node which is referred to by hash cannot be found.
+    """
+    pass
+
 
 class Node(metaclass=abc.ABCMeta):
     __slots__ = tuple()
@@ -36,6 +65,33 @@ class Node(metaclass=abc.ABCMeta):
         """
         pass
 
+    def get_many(self, keys: Sequence[Nibbles], default: Any=None) -> List[Any]:
+        """
+        Returns a list of the values mapped to by each of the sorted ``keys`` in
+        this node.  Any key which is not found is mapped to ``default``.
+        """
+        values = []  # type: List[Any]
+        if keys:
+            self._get_many(keys, 0, 0, len(keys), default, values)
+
+        return values
+
+    @abc.abstractmethod
+    def _get_many(self,
+                  keys: Sequence[Nibbles],
+                  depth: int,
+                  lo: int,
+                  hi: int,
+                  default: Any,
+                  values: List[Any]) -> None:  # pragma: no coverage
+        """
+        Appends to ``values`` the values mapped to by each of the sorted
+        ``keys[lo:hi]`` in this node, which all begin with the same ``depth``
+        nibbles of path leading to this node.  Keys are not sliced so that
+        they can be shared by each node along their path.
+        """
+        pass
+
     @abc.abstractmethod
     def delete(self, key: Nibbles) -> Optional['Node']:  # pragma: no coverage
         """
@@ -44,6 +100,14 @@ class Node(metaclass=abc.ABCMeta):
         """
         pass
 
+    @abc.abstractmethod
+    def delete_prefix(self, prefix: Nibbles) -> Optional['Node']:  # pragma: no coverage
+        """
+        Returns the result of deleting all keys which begin with ``prefix``
+        from this node.  Returns this node if no such keys exist.
+        """
+        pass
+
     @abc.abstractmethod
     def insert(self, node: 'Node') -> 'Node':  # pragma: no coverage
         """
@@ -80,6 +144,13 @@ class Node(metaclass=abc.ABCMeta):
     def __sub__(self, key: Nibbles) -> 'Node':
         return self.delete(key)
 
+    def __reduce__(self) -> Tuple[Any, ...]:
+        """
+        Nodes are pickled in flattened form so that pickling does not recurse
+        through child nodes.  Hash nodes are pickled without their database.
+        """
+        return unflatten_node, (flatten_node(self),)
+
     @classmethod
     def _all_slots(cls):
         try:
@@ -92,11 +163,12 @@ class Node(metaclass=abc.ABCMeta):
             (),
         )
 
-        # Preserve unique slot order
+        # Preserve unique slot order.  Private slots hold cached data which
+        # does not affect a node's contents.
         visited_slots = set()
         ordered_unique_slots = []
         for s in all_slots:
-            if s in visited_slots:
+            if s in visited_slots or s.startswith('_'):
                 continue
 
             ordered_unique_slots.append(s)
@@ -139,7 +211,7 @@ class Narrow(metaclass=abc.ABCMeta):
 
 
 class Leaf(Narrow, Node):
-    __slots__ = ('value',)
+    __slots__ = ('value', '_encoding')
 
     def __init__(self, key: Nibbles=None, value: bytes=None) -> None:
         self.key = key
@@ -162,12 +234,33 @@ class Leaf(Narrow, Node):
 
         raise KeyError('Key not found')
 
+    def _get_many(self,
+                  keys: Sequence[Nibbles],
+                  depth: int,
+                  lo: int,
+                  hi: int,
+                  default: Any,
+                  values: List[Any]) -> None:
+        key, value = self.key, self.value
+        n = depth + len(key)
+
+        values.extend(
+            value if len(k) == n and k[depth:] == key else default
+            for k in keys[lo:hi]
+        )
+
     def delete(self, key: Nibbles) -> None:
         if self.key == key:
             return None
 
         raise KeyError('Key not found')
 
+    def delete_prefix(self, prefix: Nibbles) -> Optional['Leaf']:
+        if self.key[:len(prefix)] == prefix:
+            return None
+
+        return self
+
     def insert(self, leaf: 'Leaf') -> Node:
         # Special cases
         if self.key == leaf.key:
@@ -206,7 +299,7 @@ class Leaf(Narrow, Node):
 
 
 class Extension(Narrow, Node):
-    __slots__ = ('node',)
+    __slots__ = ('node', '_encoding')
 
     def __init__(self, key: Nibbles=None, node: Union['Leaf', 'Branch']=None) -> None:
         self.key = key
@@ -238,6 +331,25 @@ class Extension(Narrow, Node):
 
         raise KeyError('Key not found')
 
+    def _get_many(self,
+                  keys: Sequence[Nibbles],
+                  depth: int,
+                  lo: int,
+                  hi: int,
+                  default: Any,
+                  values: List[Any]) -> None:
+        # Since keys are sorted, any keys prefixed by this node's key form a
+        # contiguous run.  No nibble is greater than 15, so such keys are
+        # all less than this node's key followed by 16.
+        prefix = keys[lo][:depth] + self.key
+        start = bisect_left(keys, prefix, lo, hi)
+        end = bisect_left(keys, prefix + (16,), start, hi)
+
+        values.extend([default] * (start - lo))
+        if start < end:
+            self.node._get_many(keys, len(prefix), start, end, default, values)
+        values.extend([default] * (hi - end))
+
     def delete(self, key: Nibbles) -> Optional['Extension']:
         i = len(self.key)
         head, tail = key[:i], key[i:]
@@ -252,6 +364,26 @@ class Extension(Narrow, Node):
 
         raise KeyError('Key not found')
 
+    def delete_prefix(self, prefix: Nibbles) -> Optional['Extension']:
+        i = len(self.key)
+
+        if len(prefix) <= i:
+            if self.key[:len(prefix)] == prefix:
+                return None
+
+            return self
+
+        if prefix[:i] != self.key:
+            return self
+
+        node = self.node.delete_prefix(prefix[i:])
+        if node is self.node:
+            return self
+        if node is None:
+            return None
+
+        return type(self)(self.key, node)
+
     def insert(self, leaf: Leaf) -> Node:
         # Special cases
         if leaf.is_shallow:
@@ -284,7 +416,7 @@ class Extension(Narrow, Node):
 
 
 class Branch(Node):
-    __slots__ = ('nodes', 'value')
+    __slots__ = ('nodes', 'value', '_encoding')
 
     def __init__(self, nodes: List[Node]=None, value: bytes=None) -> None:
         if nodes is None:
@@ -318,6 +450,45 @@ class Branch(Node):
 
         raise KeyError('Key not found')
 
+    def _get_many(self,
+                  keys: Sequence[Nibbles],
+                  depth: int,
+                  lo: int,
+                  hi: int,
+                  default: Any,
+                  values: List[Any]) -> None:
+        # Since keys are sorted, any keys which end at this node come first
+        i = lo
+        while i < hi and len(keys[i]) == depth:
+            i += 1
+        values.extend([default if self.value is None else self.value] * (i - lo))
+
+        # The remaining keys form contiguous groups which share the same
+        # nibble at this depth
+        path = None
+        while i < hi:
+            head = keys[i][depth]
+            j = i + 1
+
+            if j < hi and keys[j][depth] == head:
+                if path is None:
+                    path = keys[i][:depth]
+                j = bisect_left(keys, path + (head + 1,), j + 1, hi)
+
+            node = self.nodes[head]
+            if node is None:
+                values.extend([default] * (j - i))
+            elif j - i == 1:
+                # Lone keys gain nothing from sharing the rest of their path
+                try:
+                    values.append(node.get(keys[i][depth + 1:]))
+                except KeyError:
+                    values.append(default)
+            else:
+                node._get_many(keys, depth + 1, i, j, default, values)
+
+            i = j
+
     def delete(self, key: Nibbles) -> Optional['Branch']:
         if len(key) == 0:
             if self.value is None:
@@ -341,6 +512,26 @@ class Branch(Node):
 
         return branch
 
+    def delete_prefix(self, prefix: Nibbles) -> Optional['Branch']:
+        if len(prefix) == 0:
+            return None
+
+        head, tail = prefix[0], prefix[1:]
+        node = self.nodes[head]
+        if node is None:
+            return self
+
+        child = node.delete_prefix(tail)
+        if child is node:
+            return self
+
+        branch = type(self)(self.nodes[:], self.value)
+        branch[head] = child
+        if branch.is_empty:
+            return None
+
+        return branch
+
     def insert(self, node: Union[Leaf, Extension]) -> 'Branch':
         """
         Inserts a leaf or extension node into a branch node.
@@ -355,11 +546,11 @@ class Branch(Node):
 
         # Insert deep node into branch
         branch = type(self)(self.nodes[:], self.value)
-        if isinstance(node, Extension):
-            # We don't try to intelligently insert extensions into branches.
-            # This facility is only used by the Extension.insert method in
-            # specific cases where an extension must insert itself into an
-            # empty branch.
+        if isinstance(node, Extension) and len(node.key) == 1:
+            # An extension's referent node replaces anything under the
+            # extension's key.  Callers must ensure that no keys prefixed by
+            # the key of an inserted extension are present (see
+            # ``SimpleTrie.graft``).
             branch[node.key[0]] = node.tail()
         else:
             branch[node.key[0]] += node.tail()
@@ -405,16 +596,690 @@ class Branch(Node):
         return repr(self.value)
 
 
+class HashNode(Node):
+    """
+    A reference to a node which is stored in a database under the hash of its
+    encoding.  The referent node is decoded from the database on first use and
+    kept thereafter.
+    """
+    __slots__ = ('hash', 'db', '_node')
+
+    def __init__(self, hash: bytes, db: Mapping[bytes, bytes]=None, node: Node=None) -> None:
+        self.hash = hash
+        self.db = db
+        self._node = node
+
+    @property
+    def is_resolved(self) -> bool:
+        return self._node is not None
+
+    def resolve(self, encoded: bytes=None) -> Node:
+        """
+        Returns the referent node of this node.  If the referent node has not
+        yet been resolved, it is decoded from ``encoded`` if given or else
+        loaded from this node's database.
+        """
+        if self._node is not None:
+            return self._node
+
+        if encoded is None:
+            if self.db is None:
+                raise MissingNodeError(
+                    'Node {} is not resolved and has no database'.format(self.hash.hex()),
+                )
+
+            try:
+                encoded = self.db[self.hash]
+            except KeyError:
+                raise MissingNodeError(
+                    'Node {} not found in database'.format(self.hash.hex()),
+                )
+
+        self._node = decode_node(encoded, self.db)
+
+        return self._node
+
+    @property
+    def node(self) -> Node:
+        return self.resolve()
+
+    def evict(self) -> None:
+        """
+        Drops the referent node of this node so that it is loaded again from
+        this node's database on next use.  Any encodings cached by the
+        referent node and by children embedded in it are also dropped.
+        """
+        if self.db is None:
+            raise ValueError('Cannot evict node with no database')
+
+        self._drop()
+
+    def _drop(self) -> None:
+        stack = [self._node]
+        while stack:
+            n = stack.pop()
+            cls = type(n)
+
+            if cls is Branch:
+                n._encoding = None
+                stack.extend(n.nodes)
+            elif cls is Extension:
+                n._encoding = None
+                stack.append(n.node)
+            elif cls is Leaf:
+                n._encoding = None
+
+        self._node = None
+
+    @property
+    def is_empty(self) -> bool:
+        return False
+
+    def get(self, key: Nibbles) -> bytes:
+        return self.node.get(key)
+
+    def _get_many(self,
+                  keys: Sequence[Nibbles],
+                  depth: int,
+                  lo: int,
+                  hi: int,
+                  default: Any,
+                  values: List[Any]) -> None:
+        self.node._get_many(keys, depth, lo, hi, default, values)
+
+    def delete(self, key: Nibbles) -> Optional[Node]:
+        return self.node.delete(key)
+
+    def delete_prefix(self, prefix: Nibbles) -> Optional[Node]:
+        node = self.node.delete_prefix(prefix)
+        if node is self.node:
+            return self
+
+        return node
+
+    def insert(self, node: Node) -> Node:
+        return self.node.insert(node)
+
+    def copy(self) -> Node:
+        return self.node.copy()
+
+    def __len__(self) -> int:
+        return len(self.node)
+
+    def __eq__(self, other: 'HashNode') -> bool:
+        return type(self) is type(other) and self.hash == other.hash
+
+    def __repr__(self) -> str:  # pragma: no coverage
+        if self._node is None:
+            return '<{}>'.format(self.hash.hex())
+
+        return repr(self._node)
+
+
+def _decode_ref(item: Union[bytes, list], db: Optional[Mapping[bytes, bytes]]) -> Optional[Node]:
+    if isinstance(item, list):
+        # Nodes with encodings shorter than 32 bytes are embedded in their
+        # parent
+        return _decode_item(item, db)
+
+    if len(item) == 0:
+        return None
+
+    return HashNode(item, db)
+
+
+def _decode_item(item: list, db: Optional[Mapping[bytes, bytes]]) -> Node:
+    if len(item) == 17:
+        value = item[16]
+
+        return Branch(
+            [_decode_ref(i, db) for i in item[:16]],
+            None if isinstance(value, list) else value,
+        )
+
+    if len(item) == 2:
+        key, is_leaf = decode_hex_prefix(item[0])
+
+        if is_leaf:
+            return Leaf(key, item[1])
+
+        return Extension(key, _decode_ref(item[1], db))
+
+    raise ValueError('Encoded node had {} items'.format(len(item)))
+
+
+def decode_node(encoded: bytes, db: Mapping[bytes, bytes]=None) -> Node:
+    """
+    Decodes a node from its encoding.  Any child nodes which are referred to by
+    hash are represented as hash nodes that are resolved from ``db``.
+    """
+    return _decode_item(rlp_decode(encoded), db)
+
+
+def _encode_hex_prefix(key: Nibbles, t: bool) -> bytes:
+    return b''.join(hex_prefix(key, t))
+
+
+def _commit_item(node: Node,
+                 db: MutableMapping[bytes, bytes],
+                 force_hash: bool=False,
+                 cache: bool=True,
+                 bind: bool=True) -> Tuple[Node, Union[bytes, list]]:
+    if isinstance(node, HashNode):
+        # Hash nodes have already been committed
+        return node, node.hash
+
+    # Nodes are immutable so that any encoding cached by an earlier commit can
+    # be reused.  A cached encoding is a pair of the reference to a node from
+    # its parent and the encoded node.
+    encoding = getattr(node, '_encoding', None)
+
+    if isinstance(node, Leaf):
+        committed = node
+        if encoding is None:
+            item = [_encode_hex_prefix(node.key, True), node.value]
+
+    elif isinstance(node, Extension):
+        child, child_ref = _commit_item(node.node, db, cache=cache, bind=bind)
+
+        committed = Extension(node.key, child)
+        if encoding is None:
+            item = [_encode_hex_prefix(node.key, False), child_ref]
+
+    else:
+        children = []
+        item = []
+        for n in node.nodes:
+            if n is None:
+                children.append(None)
+                item.append(b'')
+            else:
+                child, child_ref = _commit_item(n, db, cache=cache, bind=bind)
+                children.append(child)
+                item.append(child_ref)
+
+        # A missing branch value is encoded as an empty list (rather than an
+        # empty string) so that empty values can be stored in branches
+        item.append([] if node.value is None else node.value)
+        committed = Branch(children, node.value)
+
+    if encoding is None:
+        encoded = rlp_encode(item)
+        encoding = (item if len(encoded) < 32 else keccak(encoded), encoded)
+
+        if cache:
+            node._encoding = encoding
+
+    if cache:
+        committed._encoding = encoding
+
+    ref, encoded = encoding
+
+    if isinstance(ref, list):
+        if not force_hash:
+            return committed, ref
+
+        ref = keccak(encoded)
+
+    db[ref] = encoded
+
+    return HashNode(ref, db if bind else None, committed), ref
+
+
+def commit_node(node: Node,
+                db: MutableMapping[bytes, bytes],
+                cache: bool=True,
+                bind: bool=True) -> HashNode:
+    """
+    Writes the encodings of ``node`` and of any of its children which have not
+    yet been committed into ``db`` under their hashes.  Returns a hash node
+    which refers to a copy of ``node`` in which committed children are
+    replaced by hash nodes.  Nodes are encoded as in the Ethereum yellow paper
+    with the exception of missing branch values.
+
+    If ``cache`` is true, the encodings of nodes are kept by the nodes so that
+    nodes shared with other tries or committed again are not re-encoded.
+
+    If ``bind`` is false, the returned hash nodes are not bound to ``db``, as
+    when ``db`` only gathers encodings to be written elsewhere.
+    """
+    committed, _ = _commit_item(node, db, force_hash=True, cache=cache, bind=bind)
+
+    return committed
+
+
+def _split_leaf(leaf: Leaf, key: Nibbles, value: bytes, intern_key: Callable[[Nibbles], Nibbles]=None) -> Node:
+    """
+    Returns the result of inserting ``value`` at ``key`` into ``leaf``.  If
+    given, the keys of any new nodes are interned with ``intern_key``.
+    """
+    l = prefix_length(leaf.key, key)
+
+    if l == len(leaf.key) == len(key):
+        return Leaf(leaf.key, value)
+
+    branch = Branch()
+    for k, v in ((leaf.key[l:], leaf.value), (key[l:], value)):
+        if len(k) == 0:
+            branch.value = v
+        else:
+            branch[k[0]] = Leaf(k[1:] if intern_key is None else intern_key(k[1:]), v)
+
+    if l > 0:
+        return Extension(key[:l] if intern_key is None else intern_key(key[:l]), branch)
+
+    return branch
+
+
+def _split_extension(ext: Extension,
+                     l: int,
+                     key: Nibbles,
+                     value: bytes,
+                     intern_key: Callable[[Nibbles], Nibbles]=None) -> Node:
+    """
+    Returns the result of inserting ``value`` at ``key`` into ``ext`` where
+    the keys of both share a prefix of length ``l`` which is shorter than the
+    key of ``ext``.  If given, the keys of any new nodes are interned with
+    ``intern_key``.
+    """
+    branch = Branch()
+
+    if len(ext.key) - l == 1:
+        branch[ext.key[l]] = ext.node
+    else:
+        k = ext.key[l + 1:]
+        branch[ext.key[l]] = Extension(k if intern_key is None else intern_key(k), ext.node)
+
+    if len(key) == l:
+        branch.value = value
+    else:
+        k = key[l + 1:]
+        branch[key[l]] = Leaf(k if intern_key is None else intern_key(k), value)
+
+    if l > 0:
+        return Extension(key[:l] if intern_key is None else intern_key(key[:l]), branch)
+
+    return branch
+
+
+def _rebuild(path: List[Tuple[Node, Optional[int]]], node: Optional[Node]) -> Optional[Node]:
+    """
+    Rebuilds the nodes along ``path``, from the bottom up, with ``node`` at
+    the bottom.  Each item of ``path`` is a branch and the nibble at which the
+    path continues or an extension and ``None``.  Branches and extensions
+    which would be left empty are discarded.
+    """
+    for parent, head in reversed(path):
+        if head is None:
+            node = None if node is None else Extension(parent.key, node)
+        else:
+            nodes = parent.nodes[:]
+            nodes[head] = node
+
+            # A branch can only be left empty by the removal of a child
+            if node is None and parent.value is None and all(n is None for n in nodes):
+                continue
+
+            node = Branch(nodes, parent.value)
+
+    return node
+
+
+def insert_key(node: Optional[Node],
+               key: Nibbles,
+               value: bytes,
+               intern_key: Callable[[Nibbles], Nibbles]=None) -> Node:
+    """
+    Returns the result of inserting ``value`` at ``key`` into ``node``.  Gives
+    the same result as inserting a leaf with ``Node.insert`` but descends
+    without recursion and copies only the nodes along the path of ``key``.
+    If given, the keys of any new nodes are interned with ``intern_key``.
+    """
+    path = []  # type: List[Tuple[Node, Optional[int]]]
+    i = 0
+
+    while True:
+        if node is None:
+            node = Leaf(key[i:] if intern_key is None else intern_key(key[i:]), value)
+            break
+
+        cls = type(node)
+
+        if cls is Branch:
+            if i == len(key):
+                node = Branch(node.nodes[:], value)
+                break
+
+            path.append((node, key[i]))
+            node = node.nodes[key[i]]
+            i += 1
+
+        elif cls is Leaf:
+            node = _split_leaf(node, key[i:], value, intern_key)
+            break
+
+        elif cls is Extension:
+            j = i + len(node.key)
+
+            if key[i:j] != node.key:
+                rest = key[i:]
+                node = _split_extension(node, prefix_length(node.key, rest), rest, value, intern_key)
+                break
+
+            path.append((node, None))
+            node = node.node
+            i = j
+
+        else:
+            node = node.node
+
+    return _rebuild(path, node)
+
+
+def delete_key(node: Node, key: Nibbles) -> Optional[Node]:
+    """
+    Returns the result of deleting ``key`` from ``node``.  Gives the same
+    result as ``Node.delete`` but descends without recursion.
+    """
+    path = []  # type: List[Tuple[Node, Optional[int]]]
+    i = 0
+
+    while True:
+        cls = type(node)
+
+        if cls is Branch:
+            if i == len(key):
+                if node.value is None:
+                    raise KeyError('Key not found')
+
+                node = Branch(node.nodes[:], None)
+                if node.is_empty:
+                    node = None
+                break
+
+            path.append((node, key[i]))
+            node = node.nodes[key[i]]
+            i += 1
+
+            if node is None:
+                raise KeyError('Key not found')
+
+        elif cls is Leaf:
+            if node.key != key[i:]:
+                raise KeyError('Key not found')
+
+            node = None
+            break
+
+        elif cls is Extension:
+            j = i + len(node.key)
+            if key[i:j] != node.key:
+                raise KeyError('Key not found')
+
+            path.append((node, None))
+            node = node.node
+            i = j
+
+        else:
+            node = node.node
+
+    return _rebuild(path, node)
+
+
+def iter_node(node: Node) -> Iterator[Tuple[Nibbles, bytes]]:
+    """
+    Yields the keys and values stored under ``node`` in key order.  Descends
+    without recursion.
+    """
+    stack = [((), node)]  # type: List[Tuple[Nibbles, Node]]
+
+    while stack:
+        path, n = stack.pop()
+        cls = type(n)
+
+        if cls is Leaf:
+            yield path + n.key, n.value
+
+        elif cls is Branch:
+            stack.extend(
+                (path + (i,), n.nodes[i])
+                for i in range(15, -1, -1)
+                if n.nodes[i] is not None
+            )
+
+            if n.value is not None:
+                yield path, n.value
+
+        elif cls is Extension:
+            stack.append((path + n.key, n.node))
+
+        else:
+            stack.append((path, n.node))
+
+
+FLAT_LEAF = 0
+FLAT_EXTENSION = 1
+FLAT_BRANCH = 2
+FLAT_HASH = 3
+
+FlatNode = Tuple[Any, ...]
+
+
+def flatten_node(node: Node) -> List[FlatNode]:
+    """
+    Flattens the nodes under ``node`` into a list of tuples in which child
+    nodes precede their parents and the last tuple represents ``node``.  Child
+    nodes are referred to by their negative index in the list.  Nibble keys
+    are stored as byte strings.
+    """
+    flat = []  # type: List[FlatNode]
+    append = flat.append
+
+    # Nodes are visited breadth first so that the position of each child is
+    # known when its parent is visited.  Reversing the result puts children
+    # before parents and the node at position ``i`` at index ``-i - 1``.
+    queue = [node]
+    push = queue.append
+
+    for n in queue:
+        cls = type(n)
+
+        if cls is Leaf:
+            append((FLAT_LEAF, bytes(n.key), n.value))
+
+        elif cls is Branch:
+            refs = []
+            for c in n.nodes:
+                if c is None:
+                    refs.append(None)
+                else:
+                    refs.append(-len(queue) - 1)
+                    push(c)
+
+            append((FLAT_BRANCH, tuple(refs), n.value))
+
+        elif cls is Extension:
+            append((FLAT_EXTENSION, bytes(n.key), -len(queue) - 1))
+            push(n.node)
+
+        elif n.is_resolved:
+            append((FLAT_HASH, n.hash, -len(queue) - 1))
+            push(n.node)
+
+        else:
+            append((FLAT_HASH, n.hash, None))
+
+    flat.reverse()
+
+    return flat
+
+
+def unflatten_node(flat: Sequence[FlatNode], db: Mapping[bytes, bytes]=None) -> Node:
+    """
+    Rebuilds the node represented by the last tuple in ``flat``, as returned
+    by ``flatten_node``.  Any unresolved hash nodes are resolved from ``db``.
+    """
+    nodes = [None] * len(flat)  # type: List[Optional[Node]]
+
+    # Creating many objects which are all kept alive triggers repeated
+    # garbage collections which find nothing to collect
+    gc_enabled = gc.isenabled()
+    gc.disable()
+
+    try:
+        for i, (tag, a, b) in enumerate(flat):
+            if tag == FLAT_LEAF:
+                nodes[i] = Leaf(tuple(a), b)
+            elif tag == FLAT_BRANCH:
+                nodes[i] = Branch([None if j is None else nodes[j] for j in a], b)
+            elif tag == FLAT_EXTENSION:
+                nodes[i] = Extension(tuple(a), nodes[b])
+            elif tag == FLAT_HASH:
+                nodes[i] = HashNode(a, db, None if b is None else nodes[b])
+            else:
+                raise ValueError('Unknown flattened node tag {}'.format(tag))
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    return nodes[-1]
+
+
+def _build_partitions(partitions: List[Tuple[int, List[Tuple[bytes, bytes]]]]) -> List[Tuple[int, List[FlatNode]]]:
+    """
+    Builds a trie for each of ``partitions`` and returns the flattened root of
+    each.
+    """
+    built = []
+
+    for prefix, items in partitions:
+        t = SimpleTrie()
+        for k, v in items:
+            t[k] = v
+
+        built.append((prefix, flatten_node(t._root)))
+
+    return built
+
+
 class SimpleTrie:
     """
     An immutable, base-16 radix tree that uses an in-memory database with
     pointers as references.  As a space and time saving strategy,
     ``SimpleTrie`` uses two "narrow" node types: Extension and Leaf.
+
+    If given a database ``db``, nodes may be committed to that database and
+    nodes referred to by hash are loaded from it on demand.  A trie may be
+    opened at a committed root by passing ``root_hash``.  If
+    ``cache_encodings`` is true, nodes keep their encodings once committed so
+    that they are not encoded again by later commits.
+
+    If given an ``intern_pool``, the values and node keys written to the trie
+    are interned in that pool so that equal values and keys are stored once.
+    A pool may be shared by several tries.
     """
-    __slots__ = ('_root',)
+    __slots__ = ('_root', 'db', 'cache_encodings', 'intern_pool')
+
+    def __init__(self,
+                 db: MutableMapping[bytes, bytes]=None,
+                 root_hash: bytes=None,
+                 cache_encodings: bool=True,
+                 intern_pool: InternPool=None) -> None:
+        self.db = db
+        self.cache_encodings = cache_encodings
+        self.intern_pool = intern_pool
+
+        if root_hash is None or root_hash == BLANK_ROOT:
+            self._root = None
+        else:
+            self._root = HashNode(root_hash, db)
+
+    @classmethod
+    def from_items(cls, items: Iterable[Tuple[bytes, bytes]], workers: int=None) -> 'SimpleTrie':
+        """
+        Builds a trie from the key-value pairs ``items``.  As with assignment,
+        later values override earlier values with the same key.  If
+        ``workers`` is greater than one, items are partitioned by the first
+        byte of their keys and the subtree for each partition is built in one
+        of ``workers`` processes.  Subtrees are returned in flattened form and
+        grafted under the root.
+        """
+        t = cls()
 
-    def __init__(self) -> None:
-        self._root = None
+        if workers is None or workers <= 1:
+            for k, v in items:
+                t[k] = v
+
+            return t
+
+        empty_value = None
+        by_prefix = {}  # type: Dict[int, List[Tuple[bytes, bytes]]]
+        for k, v in items:
+            if len(k) == 0:
+                empty_value = v
+            else:
+                by_prefix.setdefault(k[0], []).append((k[1:], v))
+
+        # Assign partitions to workers largest first, each to the worker with
+        # the fewest items so far
+        chunks = [[] for _ in range(workers)]  # type: List[list]
+        sizes = [0] * workers
+        for prefix, prefix_items in sorted(by_prefix.items(), key=lambda p: -len(p[1])):
+            i = sizes.index(min(sizes))
+            chunks[i].append((prefix, prefix_items))
+            sizes[i] += len(prefix_items)
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(_build_partitions, [c for c in chunks if c])
+
+            for built in results:
+                for prefix, flat in built:
+                    subtrie = cls()
+                    subtrie._root = unflatten_node(flat)
+
+                    t.graft(bytes((prefix,)), subtrie)
+
+        if empty_value is not None:
+            t[b''] = empty_value
+
+        return t
+
+    def commit(self) -> bytes:
+        """
+        Writes any nodes which have not yet been committed to this trie's
+        database and returns the hash of the root node.
+        """
+        if self.db is None:
+            raise ValueError('Cannot commit trie with no database')
+
+        if self._root is None:
+            return BLANK_ROOT
+
+        self._root = commit_node(self._root, self.db, self.cache_encodings)
+
+        return self._root.hash
+
+    def evict(self) -> None:
+        """
+        Drops all committed nodes in this trie, along with their cached
+        encodings, so that they are loaded again from the database on next
+        use.
+        """
+        stack = [self._root]
+
+        while stack:
+            n = stack.pop()
+            cls = type(n)
+
+            if cls is Branch:
+                stack.extend(n.nodes)
+            elif cls is Extension:
+                stack.append(n.node)
+            elif cls is HashNode:
+                if n.db is not None:
+                    n.evict()
+                elif n.is_resolved:
+                    stack.append(n.node)
 
     def __getitem__(self, key: bytes) -> bytes:
         if self._root is None:
@@ -425,20 +1290,128 @@ class SimpleTrie:
         except KeyError:
             raise KeyError(repr(key))
 
+    def get_many(self, keys: Iterable[bytes], default: Any=None) -> List[Any]:
+        """
+        Returns a list of the values mapped to by each of ``keys`` in the same
+        order as ``keys``.  Any key which is not found is mapped to
+        ``default``.  Keys are sorted so that the trie can be descended once
+        for all of them with lookups sharing any common paths.
+        """
+        return self._get_many([tuple(bytes_to_nibbles(k)) for k in keys], default)
+
+    def _get_many(self, nibble_keys: List[Nibbles], default: Any) -> List[Any]:
+        if self._root is None:
+            return [default] * len(nibble_keys)
+
+        order = sorted(range(len(nibble_keys)), key=nibble_keys.__getitem__)
+        sorted_values = self._root.get_many(
+            [nibble_keys[i] for i in order],
+            default,
+        )
+
+        values = [default] * len(nibble_keys)
+        for i, value in zip(order, sorted_values):
+            values[i] = value
+
+        return values
+
     def __delitem__(self, key: bytes) -> None:
         if self._root is None:
             raise KeyError(repr(key))
 
         try:
-            self._root -= tuple(bytes_to_nibbles(key))
+            self._root = delete_key(self._root, tuple(bytes_to_nibbles(key)))
         except KeyError:
             raise KeyError(repr(key))
 
+    def delete_prefix(self, prefix: bytes) -> None:
+        """
+        Deletes all keys which begin with ``prefix`` by detaching the subtree
+        reached by ``prefix``.  Only the nodes along the path of ``prefix`` are
+        copied.
+        """
+        if self._root is None:
+            return
+
+        self._root = self._root.delete_prefix(tuple(bytes_to_nibbles(prefix)))
+
+    def graft(self, prefix: bytes, trie: 'SimpleTrie') -> None:
+        """
+        Replaces all keys which begin with ``prefix`` with the keys of ``trie``
+        prefixed by ``prefix``.  The nodes of ``trie`` are shared rather than
+        copied, so any of them which are committed must also be present in
+        this trie's database.
+        """
+        self.delete_prefix(prefix)
+
+        node = trie._root
+        if node is None:
+            return
+
+        nibbles = tuple(bytes_to_nibbles(prefix))
+        if len(nibbles) == 0:
+            self._root = node
+            return
+
+        if isinstance(node, HashNode):
+            node = node.node
+
+        # Express the grafted subtree as a narrow node so that it can be
+        # inserted like a leaf
+        if isinstance(node, Leaf):
+            narrow = Leaf(nibbles + node.key, node.value)
+        elif isinstance(node, Extension):
+            narrow = Extension(nibbles + node.key, node.node)
+        else:
+            narrow = Extension(nibbles, node)
+
+        self._root += narrow
+
     def __setitem__(self, key: bytes, value: bytes) -> None:
-        self._root += Leaf(
-            tuple(bytes_to_nibbles(key)),
-            value,
-        )
+        pool = self.intern_pool
+
+        if pool is None:
+            self._root = insert_key(self._root, tuple(bytes_to_nibbles(key)), value)
+        else:
+            self._root = insert_key(
+                self._root,
+                tuple(bytes_to_nibbles(key)),
+                pool.intern(value),
+                pool.intern_key,
+            )
+
+    def update(self, items: Iterable[Tuple[bytes, bytes]]) -> None:
+        """
+        Sets the value for each key in the key-value pairs ``items``.
+        """
+        for key, value in items:
+            self[key] = value
+
+    def transaction(self) -> 'Transaction':
+        """
+        Returns a transaction for making a batch of writes to this trie.
+        Writes within a transaction modify the nodes it creates in place
+        rather than copying them::
+
+            with trie.transaction() as tx:
+                for key, value in items:
+                    tx[key] = value
+        """
+        return Transaction(self)
+
+    def items(self) -> Iterator[Tuple[bytes, bytes]]:
+        """
+        Yields the keys and values in this trie in key order.
+        """
+        if self._root is None:
+            return
+
+        for key, value in iter_node(self._root):
+            yield b''.join(nibbles_to_bytes(key)), value
+
+    def __iter__(self) -> Iterator[bytes]:
+        for key, _ in self.items():
+            yield key
 
     def __len__(self) -> int:
         if self._root is None:
@@ -446,5 +1419,304 @@ class SimpleTrie:
 
         return len(self._root)
 
+    def __getstate__(self) -> Tuple[Any, ...]:
+        """
+        Tries are pickled with their nodes in flattened form.  This is faster
+        than pickling node objects and does not recurse through child nodes.
+        Cached encodings and the entries of any intern pool are not pickled.
+        """
+        flat = None if self._root is None else flatten_node(self._root)
+
+        return flat, self.db, self.cache_encodings, self.intern_pool
+
+    def __setstate__(self, state: Tuple[Any, ...]) -> None:
+        flat, self.db, self.cache_encodings, self.intern_pool = state
+
+        if flat is None:
+            self._root = None
+        else:
+            self._root = unflatten_node(flat, self.db)
+
     def __repr__(self) -> str:  # pragma: no coverage
         return repr(self._root)
+
+
+class Transaction:
+    """
+    A batch of writes to ``trie`` which is applied when the transaction is
+    frozen.  Used as a context manager, a transaction is frozen on exit and
+    discarded if an exception is raised.
+
+    Nodes created by a transaction are owned by it and later writes modify
+    them in place rather than copying them.  Nodes shared with ``trie`` are
+    copied on write as usual, so the trie is unchanged until the transaction
+    is frozen.  Once frozen, a transaction owns no nodes and its root becomes
+    the new, immutable root of ``trie``.  Any writes made directly to
+    ``trie`` while the transaction is open are lost.
+    """
+    __slots__ = ('trie', '_root', '_owned')
+
+    def __init__(self, trie: SimpleTrie) -> None:
+        self.trie = trie
+        self._root = trie._root
+
+        # Owned nodes are kept alive so that the id of an owned node cannot be
+        # reused by a node shared with the trie
+        self._owned = {}  # type: Optional[Dict[int, Node]]
+
+    def __enter__(self) -> 'Transaction':
+        return self
+
+    def __exit__(self, exc_type: Any, exc_value: Any, traceback: Any) -> None:
+        if exc_type is None:
+            self.freeze()
+        else:
+            self.discard()
+
+    @property
+    def is_open(self) -> bool:
+        return self._owned is not None
+
+    def freeze(self) -> None:
+        """
+        Makes the result of this transaction the root of its trie.
+        """
+        if self._owned is None:
+            raise ValueError('Transaction is closed')
+
+        self._owned = None
+        self.trie._root = self._root
+
+    def discard(self) -> None:
+        """
+        Closes this transaction without changing its trie.
+        """
+        self._owned = None
+        self._root = self.trie._root
+
+    def _own(self, node: Node) -> Node:
+        self._owned[id(node)] = node
+        return node
+
+    def _own_new(self, node: Node, shared: Optional[Node]) -> Node:
+        """
+        Takes ownership of the nodes under ``node``, which were all created by
+        this transaction except ``shared`` and its descendants.
+        """
+        stack = [node]
+
+        while stack:
+            n = stack.pop()
+            if n is None or n is shared:
+                continue
+
+            self._owned[id(n)] = n
+
+            cls = type(n)
+            if cls is Branch:
+                stack.extend(n.nodes)
+            elif cls is Extension:
+                stack.append(n.node)
+
+        return node
+
+    def _attach(self, path: List[Tuple[Node, Optional[int]]], node: Optional[Node]) -> Optional[Node]:
+        """
+        Like ``_rebuild`` but modifies owned nodes along ``path`` in place.
+        Since the ancestors of an owned node already refer to it, the new root
+        is found as soon as an owned node is modified.
+        """
+        owned = self._owned
+
+        for parent, head in reversed(path):
+            if head is None:
+                if node is None:
+                    continue
+
+                if id(parent) in owned:
+                    parent.node = node
+                    return self._root
+
+                node = self._own(Extension(parent.key, node))
+
+            else:
+                if id(parent) in owned:
+                    nodes = parent.nodes
+                    nodes[head] = node
+
+                    if node is not None or parent.value is not None or not all(n is None for n in nodes):
+                        return self._root
+
+                    continue
+
+                nodes = parent.nodes[:]
+                nodes[head] = node
+
+                # A branch can only be left empty by the removal of a child
+                if node is None and parent.value is None and all(n is None for n in nodes):
+                    continue
+
+                node = self._own(Branch(nodes, parent.value))
+
+        return node
+
+    def __getitem__(self, key: bytes) -> bytes:
+        if self._root is None:
+            raise KeyError(repr(key))
+
+        try:
+            return self._root.get(tuple(bytes_to_nibbles(key)))
+        except KeyError:
+            raise KeyError(repr(key))
+
+    def __setitem__(self, key: bytes, value: bytes) -> None:
+        self.insert(tuple(bytes_to_nibbles(key)), value)
+
+    def __delitem__(self, key: bytes) -> None:
+        try:
+            self.delete(tuple(bytes_to_nibbles(key)))
+        except KeyError:
+            raise KeyError(repr(key))
+
+    def update(self, items: Iterable[Tuple[bytes, bytes]]) -> None:
+        """
+        Sets the value for each key in the key-value pairs ``items``.
+        """
+        for key, value in items:
+            self[key] = value
+
+    def __len__(self) -> int:
+        if self._root is None:
+            return 0
+
+        return len(self._root)
+
+    def insert(self, key: Nibbles, value: bytes) -> None:
+        """
+        Inserts ``value`` at the nibble key ``key``.  Follows ``insert_key``.
+        Values and keys are interned in the trie's pool if it has one.
+        """
+        owned = self._owned
+        if owned is None:
+            raise ValueError('Transaction is closed')
+
+        pool = self.trie.intern_pool
+        if pool is None:
+            intern_key = None
+        else:
+            intern_key = pool.intern_key
+            value = pool.intern(value)
+
+        node = self._root
+        path = []  # type: List[Tuple[Node, Optional[int]]]
+        i = 0
+
+        while True:
+            if node is None:
+                node = self._own(Leaf(key[i:] if intern_key is None else intern_key(key[i:]), value))
+                break
+
+            cls = type(node)
+
+            if cls is Branch:
+                if i == len(key):
+                    if id(node) in owned:
+                        node.value = value
+                        return
+
+                    node = self._own(Branch(node.nodes[:], value))
+                    break
+
+                path.append((node, key[i]))
+                node = node.nodes[key[i]]
+                i += 1
+
+            elif cls is Leaf:
+                if id(node) in owned and node.key == key[i:]:
+                    node.value = value
+                    return
+
+                node = self._own_new(_split_leaf(node, key[i:], value, intern_key), None)
+                break
+
+            elif cls is Extension:
+                j = i + len(node.key)
+
+                if key[i:j] != node.key:
+                    rest = key[i:]
+                    node = self._own_new(
+                        _split_extension(node, prefix_length(node.key, rest), rest, value, intern_key),
+                        node.node,
+                    )
+                    break
+
+                path.append((node, None))
+                node = node.node
+                i = j
+
+            else:
+                node = node.node
+
+        self._root = self._attach(path, node)
+
+    def delete(self, key: Nibbles) -> None:
+        """
+        Deletes the nibble key ``key``.  Follows ``delete_key``.
+        """
+        owned = self._owned
+        if owned is None:
+            raise ValueError('Transaction is closed')
+
+        node = self._root
+        if node is None:
+            raise KeyError('Key not found')
+
+        path = []  # type: List[Tuple[Node, Optional[int]]]
+        i = 0
+
+        while True:
+            cls = type(node)
+
+            if cls is Branch:
+                if i == len(key):
+                    if node.value is None:
+                        raise KeyError('Key not found')
+
+                    if id(node) in owned:
+                        node.value = None
+                        if not node.is_empty:
+                            return
+                        node = None
+                    elif all(n is None for n in node.nodes):
+                        node = None
+                    else:
+                        node = self._own(Branch(node.nodes[:], None))
+                    break
+
+                path.append((node, key[i]))
+                node = node.nodes[key[i]]
+                i += 1
+
+                if node is None:
+                    raise KeyError('Key not found')
+
+            elif cls is Leaf:
+                if node.key != key[i:]:
+                    raise KeyError('Key not found')
+
+                node = None
+                break
+
+            elif cls is Extension:
+                j = i + len(node.key)
+                if key[i:j] != node.key:
+                    raise KeyError('Key not found')
+
+                path.append((node, None))
+                node = node.node
+                i = j
+
+            else:
+                node = node.node
+
+        self._root = self._attach(path, node)
@@ -6,6 +6,7 @@ from typing import (
     Optional,
     Union,
     Sequence,
+    Tuple,
 )
 
 
@@ -19,6 +20,27 @@ def bytes_to_nibbles(xs: Union[bytes, BytesIO]) -> Iterator[int]:
         yield x % 16
 
 
+_HEX_TO_NIBBLES = bytes.maketrans(b'0123456789abcdef', bytes(range(16)))
+_NIBBLES_TO_HEX = bytes.maketrans(bytes(range(16)), b'0123456789abcdef')
+
+
+def bytes_to_nibble_bytes(xs: bytes) -> bytes:
+    """
+    Converts the byte string ``xs`` into a byte string with one byte for each
+    nibble of ``xs``.  Equivalent to ``bytes(bytes_to_nibbles(xs))`` but
+    avoids a generator step per nibble.
+    """
+    return xs.hex().encode('ascii').translate(_HEX_TO_NIBBLES)
+
+
+def nibble_bytes_to_bytes(xs: bytes) -> bytes:
+    """
+    Converts a byte string with one byte for each nibble (containing an even
+    number of nibbles) back into the byte string composed of those nibbles.
+    """
+    return bytes.fromhex(xs.translate(_NIBBLES_TO_HEX).decode('ascii'))
+
+
 def nibbles_to_bytes(xs: Iterable[int]) -> Iterator[bytes]:
     """
     Converts an iterable of nibbles (containing an even number of nibbles) into
@@ -54,6 +76,104 @@ def hex_prefix(xs: Sequence[int], t: bool) -> Iterator[bytes]:
     return nibbles_to_bytes(chain((flags + 1,), xs))
 
 
+def decode_hex_prefix(xs: bytes) -> Tuple[Tuple[int, ...], bool]:
+    """
+    Converts the hex prefix representation ``xs`` of a sequence of nibbles back
+    into that sequence.  Also returns a boolean value that indicates if the
+    representation was flagged as terminal.
+    """
+    nibbles = tuple(bytes_to_nibbles(xs))
+    if len(nibbles) == 0:
+        raise ValueError('Hex prefix representation was empty')
+
+    flags = nibbles[0]
+    t = flags & 2 != 0
+
+    if flags & 1:
+        return nibbles[1:], t
+
+    return nibbles[2:], t
+
+
+def rlp_encode(item: Union[bytes, Sequence]) -> bytes:
+    """
+    Encodes ``item``, either a byte string or a (possibly nested) sequence of
+    byte strings, with recursive length prefix encoding.
+    """
+    if isinstance(item, (bytes, bytearray)):
+        if len(item) == 1 and item[0] < 0x80:
+            return bytes(item)
+
+        return _rlp_length_prefix(len(item), 0x80) + item
+
+    payload = b''.join(rlp_encode(i) for i in item)
+
+    return _rlp_length_prefix(len(payload), 0xc0) + payload
+
+
+def _rlp_length_prefix(length: int, offset: int) -> bytes:
+    if length < 56:
+        return bytes((offset + length,))
+
+    length_bytes = length.to_bytes((length.bit_length() + 7) // 8, 'big')
+
+    return bytes((offset + 55 + len(length_bytes),)) + length_bytes
+
+
+def rlp_decode(xs: bytes) -> Union[bytes, list]:
+    """
+    Decodes the recursive length prefix encoded byte string ``xs`` into a byte
+    string or a (possibly nested) list of byte strings.
+    """
+    item, end = _rlp_decode_item(xs, 0)
+
+    if end != len(xs):
+        raise ValueError('RLP input had trailing bytes')
+
+    return item
+
+
+def _rlp_decode_item(xs: bytes, start: int) -> Tuple[Union[bytes, list], int]:
+    if start >= len(xs):
+        raise ValueError('RLP input was truncated')
+
+    prefix = xs[start]
+
+    if prefix < 0x80:
+        return xs[start:start + 1], start + 1
+
+    if prefix < 0xc0:
+        offset, is_list = 0x80, False
+    else:
+        offset, is_list = 0xc0, True
+
+    if prefix - offset < 56:
+        begin = start + 1
+        length = prefix - offset
+    else:
+        length_of_length = prefix - offset - 55
+        begin = start + 1 + length_of_length
+        length = int.from_bytes(xs[start + 1:begin], 'big')
+
+    end = begin + length
+    if end > len(xs):
+        raise ValueError('RLP input was truncated')
+
+    if not is_list:
+        return xs[begin:end], end
+
+    items = []
+    i = begin
+    while i < end:
+        item, i = _rlp_decode_item(xs, i)
+        items.append(item)
+
+    if i != end:
+        raise ValueError('RLP list payload had inconsistent length')
+
+    return items, end
+
+
 def indent(txt: str, prefix: str, rest_prefix: Optional[str]=None) -> str:
     """
     Indents string ``txt`` with the string ``prefix``.  If ``rest_prefix``
@@ -0,0 +1,258 @@
+import asyncio
+import os
+
+import pytest
+
+from simpletrie.async_trie import (
+    AsyncNodeStore,
+    AsyncSimpleTrie,
+)
+from simpletrie.trie import (
+    BLANK_ROOT,
+    MissingNodeError,
+    SimpleTrie,
+)
+
+
+class MemoryStore(AsyncNodeStore):
+    """
+    An in-memory stand-in for an asynchronous node store which records fetches
+    and the greatest number of fetches in flight at once.
+    """
+    def __init__(self, db=None):
+        self.db = {} if db is None else db
+        self.fetches = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def get(self, key):
+        self.fetches.append(key)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        try:
+            await asyncio.sleep(0)
+            return self.db[key]
+        finally:
+            self.in_flight -= 1
+
+    async def set(self, key, value):
+        await asyncio.sleep(0)
+        self.db[key] = value
+
+
+@pytest.fixture
+def committed():
+    db = {}
+    t = SimpleTrie(db)
+
+    items = {os.urandom(32): os.urandom(40) for _ in range(200)}
+    items[b''] = b'empty key'
+    items[b'do'] = b'verb'
+    items[b'dog'] = b'puppy'
+
+    for k, v in items.items():
+        t[k] = v
+
+    return db, t.commit(), items
+
+
+def test_async_trie_get(committed):
+    db, root_hash, items = committed
+    at = AsyncSimpleTrie(MemoryStore(db), root_hash)
+
+    async def check():
+        for k, v in items.items():
+            assert await at.get(k) == v
+
+        with pytest.raises(KeyError):
+            await at.get(b'missing')
+
+    asyncio.run(check())
+
+
+def test_async_trie_get_many(committed):
+    db, root_hash, items = committed
+    store = MemoryStore(db)
+    at = AsyncSimpleTrie(store, root_hash)
+
+    keys = list(items) + [b'missing', b'do']
+    values = asyncio.run(at.get_many(keys, b'default'))
+
+    assert values == [items[k] for k in items] + [b'default', b'verb']
+
+    # Every node was fetched once, and children of branches concurrently
+    assert len(store.fetches) == len(set(store.fetches))
+    assert store.max_in_flight > 1
+
+
+def test_async_trie_coalesces_fetches(committed):
+    db, root_hash, items = committed
+    store = MemoryStore(db)
+    at = AsyncSimpleTrie(store, root_hash)
+
+    keys = list(items)
+
+    async def check():
+        return await asyncio.gather(*(at.get(k) for k in keys))
+
+    assert asyncio.run(check()) == [items[k] for k in keys]
+    assert len(store.fetches) == len(set(store.fetches))
+
+
+def test_async_trie_cancelled_get(committed):
+    db, root_hash, items = committed
+    store = MemoryStore(db)
+    at = AsyncSimpleTrie(store, root_hash)
+
+    k1, k2 = list(items)[:2]
+
+    async def check():
+        g1 = asyncio.ensure_future(at.get(k1))
+        g2 = asyncio.ensure_future(at.get(k2))
+
+        # Both wait on the shared fetch of the root
+        await asyncio.sleep(0)
+        assert len(at._fetches) == 1
+
+        g1.cancel()
+
+        assert await g2 == items[k2]
+        with pytest.raises(asyncio.CancelledError):
+            await g1
+
+        # A get which is cancelled before its fetch starts
+        at._trie._root = SimpleTrie(db, root_hash)._root
+        g3 = asyncio.ensure_future(at.get(k1))
+        await asyncio.sleep(0)
+        fetch, = at._fetches.values()
+        fetch.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await g3
+
+        await asyncio.sleep(0)
+        assert at._fetches == {}
+
+        assert await at.get(k1) == items[k1]
+
+    asyncio.run(check())
+
+
+def test_async_trie_set_delete_commit(committed):
+    db, root_hash, items = committed
+    store = MemoryStore(dict(db))
+    at = AsyncSimpleTrie(store, root_hash)
+
+    expected = SimpleTrie(db, root_hash)
+
+    deleted = list(items)[:50]
+    added = {os.urandom(20): os.urandom(20) for _ in range(50)}
+
+    async def modify():
+        for k in deleted:
+            await at.delete(k)
+            del expected[k]
+
+        for k, v in added.items():
+            await at.set(k, v)
+            expected[k] = v
+
+        with pytest.raises(KeyError):
+            await at.delete(deleted[0])
+
+        return await at.commit()
+
+    new_root_hash = asyncio.run(modify())
+
+    assert new_root_hash == expected.commit()
+
+    reopened = SimpleTrie(store.db, new_root_hash)
+    assert len(reopened) == len(items) - len(deleted) + len(added)
+    for k in deleted:
+        with pytest.raises(KeyError):
+            reopened[k]
+    for k, v in added.items():
+        assert reopened[k] == v
+
+
+def test_async_trie_evict(committed):
+    db, root_hash, items = committed
+    store = MemoryStore(dict(db))
+    at = AsyncSimpleTrie(store, root_hash)
+
+    added = {os.urandom(20): os.urandom(20) for _ in range(20)}
+
+    async def check():
+        for k, v in added.items():
+            await at.set(k, v)
+        new_root_hash = await at.commit()
+
+        # Committed nodes are not bound to a database other than the store
+        root = at._trie._root
+        assert root.db is None
+        assert root.is_resolved
+
+        at.evict()
+        assert not root.is_resolved
+
+        store.fetches.clear()
+        for k, v in list(added.items()) + list(items.items())[:20]:
+            assert await at.get(k) == v
+        assert root_hash not in store.fetches
+        assert new_root_hash in store.fetches
+
+        assert await at.commit() == new_root_hash
+
+    asyncio.run(check())
+
+
+def test_async_trie_evict_during_operations(committed):
+    db, root_hash, items = committed
+    store = MemoryStore(dict(db))
+    at = AsyncSimpleTrie(store, root_hash)
+
+    keys = list(items)[:50]
+    added = {os.urandom(20): os.urandom(20) for _ in range(20)}
+
+    async def evict_repeatedly():
+        for _ in range(50):
+            await asyncio.sleep(0)
+            at.evict()
+
+    async def check():
+        results = await asyncio.gather(
+            evict_repeatedly(),
+            at.get_many(keys),
+            *(at.get(k) for k in keys),
+            *(at.set(k, v) for k, v in added.items()),
+        )
+        assert results[1] == [items[k] for k in keys]
+        assert results[2:2 + len(keys)] == [items[k] for k in keys]
+
+        for k, v in added.items():
+            assert await at.get(k) == v
+
+    asyncio.run(check())
+
+
+def test_async_trie_empty():
+    store = MemoryStore()
+    at = AsyncSimpleTrie(store)
+
+    async def check():
+        assert await at.get_many([b'a', b'b']) == [None, None]
+        assert await at.commit() == BLANK_ROOT
+
+        await at.set(b'a', b'1')
+        root_hash = await at.commit()
+
+        assert await AsyncSimpleTrie(store, root_hash).get(b'a') == b'1'
+
+    asyncio.run(check())
+
+
+def test_async_trie_missing_node():
+    at = AsyncSimpleTrie(MemoryStore(), b'\x00' * 32)
+
+    with pytest.raises(MissingNodeError):
+        asyncio.run(at.get(b'a'))
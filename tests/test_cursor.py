@@ -0,0 +1,115 @@
+import bisect
+
+from hypothesis import (
+    given,
+    settings,
+    strategies as st,
+)
+
+from simpletrie.cursor import (
+    TrieCursor,
+)
+from simpletrie.trie import (
+    SimpleTrie,
+)
+
+
+keys = st.binary(max_size=4)
+key_value_pairs = st.tuples(keys, st.binary(max_size=4))
+pair_lists = st.lists(key_value_pairs, max_size=50, unique_by=lambda pair: pair[0])
+
+
+@settings(deadline=None)
+@given(pair_lists)
+def test_cursor_next_prev(pairs):
+    t = SimpleTrie()
+    t.update(pairs)
+    expected = sorted(pairs)
+
+    c = TrieCursor(t)
+
+    assert [c.next() for _ in expected] == expected
+    assert c.next() is None
+    assert c.next() is None
+
+    assert [c.prev() for _ in expected] == expected[::-1]
+    assert c.prev() is None
+    assert c.prev() is None
+
+    assert c.next() == (expected[0] if expected else None)
+
+
+@settings(deadline=None)
+@given(pair_lists, st.lists(keys, max_size=10))
+def test_cursor_seek(pairs, seek_keys):
+    t = SimpleTrie()
+    t.update(pairs)
+    expected = sorted(pairs)
+    expected_keys = [k for k, _ in expected]
+
+    c = TrieCursor(t)
+
+    for key in seek_keys:
+        i = bisect.bisect_left(expected_keys, key)
+
+        assert c.seek(key) == (expected[i] if i < len(expected) else None)
+
+        # Cursor should be able to move in either direction after seeking
+        if i < len(expected):
+            assert c.next() == (expected[i + 1] if i + 1 < len(expected) else None)
+            c.seek(key)
+        assert c.prev() == (expected[i - 1] if i > 0 else None)
+
+
+@settings(deadline=None)
+@given(pair_lists, keys, keys, st.integers(min_value=1, max_value=10))
+def test_cursor_range(pairs, start, stop, limit):
+    t = SimpleTrie()
+    t.update(pairs)
+    expected = [(k, v) for k, v in sorted(pairs) if start <= k < stop]
+
+    c = TrieCursor(t)
+
+    assert c.range(start, stop) == expected
+
+    # Ranges should be resumable in pages
+    pages = [c.range(start, stop, limit)]
+    while pages[-1]:
+        pages.append(c.range(None, stop, limit))
+
+    assert all(len(p) <= limit for p in pages)
+    assert sum(pages, []) == expected
+
+
+def test_cursor_is_pinned():
+    db = {}
+    t = SimpleTrie(db)
+    t.update((bytes((i,)), bytes((i,))) for i in range(10))
+    t.commit()
+
+    c = TrieCursor(t)
+    assert c.seek(b'\x05') == (b'\x05', b'\x05')
+
+    # Writes to the trie should not affect the cursor
+    del t[b'\x06']
+    t[b'\x05\x00'] = b'new'
+
+    assert c.next() == (b'\x06', b'\x06')
+    assert c.range() == [(bytes((i,)), bytes((i,))) for i in range(7, 10)]
+
+    assert TrieCursor(t).range(b'\x05', b'\x07') == [
+        (b'\x05', b'\x05'),
+        (b'\x05\x00', b'new'),
+    ]
+
+
+def test_cursor_empty_trie():
+    c = TrieCursor(SimpleTrie())
+
+    assert c.first() is None
+    assert c.last() is None
+    assert c.next() is None
+    assert c.prev() is None
+    assert c.seek(b'a') is None
+    assert c.range() == []
+    assert c.item is None
@@ -0,0 +1,131 @@
+import os
+import random
+
+import pytest
+
+from simpletrie.db import (
+    RefCountedDB,
+    child_hashes,
+)
+from simpletrie.trie import (
+    SimpleTrie,
+    commit_node,
+)
+
+
+def reachable(root_hash, db):
+    """
+    Returns the hashes of all nodes reachable from ``root_hash`` in ``db``.
+    """
+    hashes = set()
+    stack = [root_hash]
+
+    while stack:
+        h = stack.pop()
+        if h in hashes:
+            continue
+
+        hashes.add(h)
+        stack.extend(child_hashes(db[h]))
+
+    return hashes
+
+
+@pytest.fixture
+def versions():
+    """
+    Returns a database containing several versions of a trie along with the
+    root hashes of those versions.
+    """
+    random.seed(0)
+
+    db = RefCountedDB()
+    t = SimpleTrie(db)
+
+    keys = []
+    root_hashes = []
+    for _ in range(5):
+        for _ in range(100):
+            k = os.urandom(32)
+            t[k] = os.urandom(40)
+            keys.append(k)
+
+        for k in random.sample(keys, 20):
+            keys.remove(k)
+            del t[k]
+
+        root_hashes.append(t.commit())
+
+    return db, root_hashes
+
+
+def test_child_hashes():
+    db = {}
+    t = SimpleTrie(db)
+    for i in range(16):
+        t[bytes((i * 16,)) * 32] = bytes((i,)) * 32
+
+    root_hash = t.commit()
+
+    children = child_hashes(db[root_hash])
+
+    assert len(children) == 16
+    assert all(c in db for c in children)
+
+
+def test_refcounts_match_references(versions):
+    db, root_hashes = versions
+
+    expected = {h: 0 for h in db}
+    for h in db:
+        for child in child_hashes(db[h]):
+            expected[child] += 1
+
+    assert dict(db.refcounts) == expected
+
+
+@pytest.mark.parametrize('batch_size', (None, 1, 50))
+def test_prune(versions, batch_size):
+    db, root_hashes = versions
+    keep_roots = root_hashes[2::2]
+
+    expected = set().union(*(reachable(h, db) for h in keep_roots))
+    assert set(db) > expected
+
+    while db.prune(keep_roots, batch_size):
+        pass
+
+    assert set(db) == expected
+
+    for h in keep_roots:
+        t = SimpleTrie(db, h)
+        assert len(t) > 0
+
+    # Further pruning should do nothing
+    assert db.prune(keep_roots) == 0
+    assert set(db) == expected
+
+
+def test_prune_interleaved_with_commits(versions):
+    db, root_hashes = versions
+    t = SimpleTrie(db, root_hashes[-1])
+
+    # Begin pruning all but the latest version
+    db.prune(root_hashes[-1:], batch_size=10)
+
+    for _ in range(20):
+        for _ in range(10):
+            t[os.urandom(32)] = os.urandom(40)
+        root_hash = t.commit()
+
+        db.prune([root_hash], batch_size=10)
+
+    while db.prune([root_hash], batch_size=10):
+        pass
+
+    assert set(db) == reachable(root_hash, db)
+
+    # Latest version should be fully readable
+    reopened = SimpleTrie(db, root_hash)
+    assert len(reopened) == 5 * 80 + 20 * 10
+    assert commit_node(reopened._root.copy(), {}).hash == root_hash
@@ -0,0 +1,95 @@
+import pytest
+
+from benchmarks.harness import (
+    OPS,
+    MismatchError,
+    TrieTarget,
+    check_budget,
+    generate_workload,
+    percentile,
+    prefix_stop,
+    record_baseline,
+    replay,
+    summarize,
+)
+
+
+def test_generate_workload_is_deterministic():
+    assert generate_workload(7, 50, 50) == generate_workload(7, 50, 50)
+    assert generate_workload(7, 50, 50) != generate_workload(8, 50, 50)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_replay_matches_oracle(seed):
+    workload = generate_workload(seed, num_keys=300, num_ops=300, mix=(0.4, 0.2, 0.2, 0.2))
+
+    latencies = replay(workload)
+
+    for name in ('dict', 'trie'):
+        assert sum(len(latencies[name][kind]) for kind in OPS) == 300
+
+
+def test_replay_detects_mismatch(monkeypatch):
+    monkeypatch.setattr(TrieTarget, 'delete', lambda self, key: True)
+
+    with pytest.raises(MismatchError):
+        replay(generate_workload(0, num_keys=100, num_ops=200, mix=(0, 0, 1, 0)))
+
+
+@pytest.mark.parametrize(
+    'prefix,stop',
+    (
+        (b'\x01', b'\x02'),
+        (b'\x01\xff', b'\x02'),
+        (b'\xff\xff', None),
+    ),
+)
+def test_prefix_stop(prefix, stop):
+    assert prefix_stop(prefix) == stop
+
+
+def test_percentile():
+    values = list(range(1, 101))
+
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([], 50) == 0
+
+
+def test_check_budget():
+    latencies = {
+        'dict': {'get': [10] * 100, 'scan': []},
+        'trie': {'get': [100] * 99 + [1000], 'scan': []},
+    }
+    summary = summarize(latencies, {'dict': 100, 'trie': 1000})
+
+    assert summary['ratios']['get'] == {'p50': 10, 'p99': 10}
+    assert 'scan' not in summary['ratios']
+
+    tolerance = {'p50': 1.5, 'p99': 2, 'peak_memory': 1.25}
+
+    assert check_budget(summary, {
+        'tolerance': tolerance,
+        'baseline': {'get': {'p50': 7, 'p99': 5}, 'scan': {'p50': 1}, 'peak_memory': 8},
+    }) == []
+    assert check_budget(summary, {
+        'tolerance': tolerance,
+        'baseline': {'get': {'p50': 6, 'p99': 5}, 'peak_memory': 7},
+    }) == [
+        'get p50 ratio 10.00 exceeds 9.00 (baseline 6.00 x 1.5)',
+        'peak_memory ratio 10.00 exceeds 8.75 (baseline 7.00 x 1.25)',
+    ]
+
+
+def test_record_baseline():
+    summaries = [
+        {'ratios': {'get': {'p50': 2.001, 'p99': 4}, 'peak_memory': 3}},
+        {'ratios': {'get': {'p50': 1.5, 'p99': 50}, 'peak_memory': 2.5}},
+        {'ratios': {'get': {'p50': 1.8, 'p99': 5}, 'peak_memory': 2}},
+    ]
+
+    # One noisy run does not move the baseline
+    assert record_baseline(summaries) == {
+        'get': {'p50': 1.8, 'p99': 5},
+        'peak_memory': 2.5,
+    }
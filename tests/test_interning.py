@@ -0,0 +1,87 @@
+import pickle
+
+from simpletrie.interning import (
+    InternPool,
+)
+from simpletrie.trie import (
+    SimpleTrie,
+    iter_node,
+)
+
+
+def test_intern_pool_intern():
+    pool = InternPool()
+
+    a = pool.intern(bytes(range(40)))
+    b = pool.intern(tuple(range(40)))
+
+    assert pool.intern(bytes(range(40))) is a
+    assert pool.intern(tuple(range(40))) is b
+    assert len(pool) == 2
+
+
+def test_intern_pool_intern_key():
+    pool = InternPool(max_key_length=4)
+
+    short = pool.intern_key((1, 2, 3, 4))
+    long = (1, 2, 3, 4, 5)
+
+    assert pool.intern_key((1, 2, 3, 4)) is short
+    assert pool.intern_key(long) is long
+    assert long not in pool
+
+
+def test_intern_pool_purge():
+    pool = InternPool()
+
+    kept = pool.intern(bytes(range(40)))
+    pool.intern(bytes(range(41)))
+
+    assert pool.purge() == 1
+    assert kept in pool
+    assert bytes(range(41)) not in pool
+
+
+def test_intern_pool_purges_as_it_grows():
+    pool = InternPool(min_purge_size=10)
+    kept = [pool.intern(bytes((i,)) * 40) for i in range(5)]
+
+    for i in range(100):
+        pool.intern(bytes((i,)) * 41)
+
+    assert len(pool) < 20
+    assert all(k in pool for k in kept)
+
+
+def test_intern_pool_pickle():
+    pool = InternPool(max_key_length=4, min_purge_size=10)
+    pool.intern(bytes(range(40)))
+
+    loaded = pickle.loads(pickle.dumps(pool))
+
+    assert len(loaded) == 0
+    assert loaded.max_key_length == 4
+    assert loaded.min_purge_size == 10
+
+
+def test_simple_trie_intern_pool():
+    items = [(bytes((i, j)), bytes(32)) for i in range(20) for j in range(0, 256, 16)]
+
+    pool = InternPool()
+    t = SimpleTrie(intern_pool=pool)
+    t.update(items)
+
+    expected = SimpleTrie()
+    expected.update(items)
+
+    assert t._root == expected._root
+    assert len(set(id(v) for _, v in iter_node(t._root))) == 1
+
+    # Leaves below each first byte have equal keys
+    keys = [n.key for n in t._root.nodes[0].nodes[0].nodes]
+    assert len(set(map(id, keys))) == 1
+
+    with t.transaction() as tx:
+        tx[b'\xff\xff'] = bytes(32)
+
+    assert len(set(id(v) for _, v in iter_node(t._root))) == 1
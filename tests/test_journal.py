@@ -0,0 +1,143 @@
+import os
+import threading
+import time
+
+import pytest
+
+from simpletrie.journal import (
+    JournaledTrie,
+)
+from simpletrie.trie import (
+    SimpleTrie,
+)
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'trie.journal')
+
+
+def test_journaled_trie_recovers_writes(path):
+    db = {}
+
+    with JournaledTrie(path, db) as t:
+        for i in range(100):
+            t[bytes((i,))] = bytes((i,)) * 4
+        for i in range(0, 100, 3):
+            del t[bytes((i,))]
+
+        with pytest.raises(KeyError):
+            del t[b'missing']
+
+        expected = {
+            bytes((i,)): bytes((i,)) * 4
+            for i in range(100) if i % 3 != 0
+        }
+
+    with JournaledTrie(path, db) as t:
+        assert len(t) == len(expected)
+        assert t.get_many(expected) == list(expected.values())
+
+
+def test_journaled_trie_recovers_synced_writes_after_crash(path):
+    db = {}
+
+    t = JournaledTrie(path, db, sync_every=10, sync_interval=60)
+    for i in range(15):
+        t[bytes((i,))] = b'x'
+
+    # Open journal again without closing it, as after a crash.  Only writes
+    # synced in the first group should be recovered.
+    recovered = JournaledTrie(path, db)
+    assert len(recovered) == 10
+    assert recovered[b'\x09'] == b'x'
+    with pytest.raises(KeyError):
+        recovered[b'\x0a']
+
+    t._file.close()
+    recovered.close()
+
+
+def test_journaled_trie_syncs_pending_writes_after_interval(path):
+    db = {}
+
+    def wait_for_sync(t):
+        deadline = time.monotonic() + 5
+        while t._unsynced and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    t = JournaledTrie(path, db, sync_every=100, sync_interval=0.05)
+    threads = threading.active_count()
+
+    # No further writes arrive after each burst, but the pending writes are
+    # synced once the interval has passed by the same flusher thread
+    for burst in range(2):
+        for i in range(5):
+            t[bytes((burst, i))] = b'x'
+
+        assert t._unsynced > 0
+        wait_for_sync(t)
+        assert t._unsynced == 0
+        assert threading.active_count() == threads
+
+    recovered = JournaledTrie(path, db)
+    assert len(recovered) == 10
+    recovered.close()
+
+    t.close()
+    assert not t._flusher.is_alive()
+
+
+def test_journaled_trie_ignores_partial_record(path):
+    db = {}
+
+    with JournaledTrie(path, db) as t:
+        t[b'a'] = b'1'
+        t[b'b'] = b'2'
+
+    # Simulate a crash part way through appending a record
+    size = os.path.getsize(path)
+    with open(path, 'r+b') as f:
+        f.truncate(size - 3)
+
+    with JournaledTrie(path, db) as t:
+        assert len(t) == 1
+        assert t[b'a'] == b'1'
+
+        t[b'c'] = b'3'
+
+    with JournaledTrie(path, db) as t:
+        assert len(t) == 2
+        assert t[b'c'] == b'3'
+
+
+def test_journaled_trie_checkpoint(path):
+    db = {}
+
+    with JournaledTrie(path, db) as t:
+        for i in range(100):
+            t[bytes((i,))] = b'x'
+
+        size_before = os.path.getsize(path)
+        root_hash = t.checkpoint()
+        size_after = os.path.getsize(path)
+
+        assert size_after < size_before
+        assert len(SimpleTrie(db, root_hash)) == 100
+
+        del t[b'\x00']
+        t[b'new'] = b'y'
+
+    with JournaledTrie(path, db) as t:
+        assert len(t) == 100
+        assert t[b'new'] == b'y'
+        with pytest.raises(KeyError):
+            t[b'\x00']
+
+
+def test_journaled_trie_invalid_journal(path):
+    with open(path, 'wb') as f:
+        f.write(b'not a journal')
+
+    with pytest.raises(ValueError, match='Invalid journal header'):
+        JournaledTrie(path, {})
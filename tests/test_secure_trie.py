@@ -0,0 +1,167 @@
+import pickle
+
+from eth_hash.auto import keccak
+import pytest
+
+from simpletrie.interning import (
+    InternPool,
+)
+from simpletrie.secure_trie import (
+    SecureTrie,
+    hash_to_nibbles,
+)
+from simpletrie.trie import (
+    SimpleTrie,
+)
+from simpletrie.utils import (
+    bytes_to_nibbles,
+)
+
+
+ITEMS = [(bytes((i,)) * (i % 5), bytes((i,)) * 3) for i in range(50)]
+ITEMS = list(dict(ITEMS).items())
+
+
+def test_hash_to_nibbles():
+    for key, _ in ITEMS:
+        h = keccak(key)
+        assert hash_to_nibbles(h) == tuple(bytes_to_nibbles(h))
+
+
+def test_secure_trie_matches_hashed_simple_trie():
+    secure = SecureTrie({})
+    plain = SimpleTrie({})
+
+    for key, value in ITEMS:
+        secure[key] = value
+        plain[keccak(key)] = value
+
+    assert secure._root == plain._root
+    assert secure.commit() == plain.commit()
+
+
+def test_secure_trie_get_set_delete():
+    t = SecureTrie()
+    t.update(ITEMS)
+
+    assert len(t) == len(ITEMS)
+    for key, value in ITEMS:
+        assert t[key] == value
+
+    assert t.get_many([k for k, _ in ITEMS] + [b'missing']) == (
+        [v for _, v in ITEMS] + [None]
+    )
+
+    with pytest.raises(KeyError, match='missing'):
+        t[b'missing']
+
+    for key, _ in ITEMS:
+        del t[key]
+
+        with pytest.raises(KeyError):
+            t[key]
+        with pytest.raises(KeyError):
+            del t[key]
+
+    assert len(t) == 0
+
+
+def test_secure_trie_items():
+    t = SecureTrie(max_preimages=None)
+    t.update(ITEMS)
+
+    assert sorted(t.items()) == sorted(ITEMS)
+    assert sorted(t) == sorted(k for k, _ in ITEMS)
+    assert sorted(t.hashed_items()) == sorted((keccak(k), v) for k, v in ITEMS)
+
+
+def test_secure_trie_bounded_preimages():
+    t = SecureTrie(max_preimages=10)
+    t.update(ITEMS)
+
+    # Only the most recently written preimages are kept
+    assert list(t.preimages.values()) == [k for k, _ in ITEMS[-10:]]
+
+    # Keys whose preimages are not kept are yielded as their hashes
+    expected = [(k if i >= len(ITEMS) - 10 else keccak(k), v) for i, (k, v) in enumerate(ITEMS)]
+    assert sorted(t.items()) == sorted(expected)
+    assert sorted(t) == sorted(k for k, _ in expected)
+
+    # Preimages are discarded along with their keys
+    del t[ITEMS[-1][0]]
+    assert len(t.preimages) == 9
+
+
+def test_secure_trie_no_preimages():
+    t = SecureTrie()
+    t.update(ITEMS)
+
+    assert len(t.preimages) == 0
+    assert sorted(t) == sorted(keccak(k) for k, _ in ITEMS)
+
+
+def test_secure_trie_pickle():
+    t = SecureTrie(max_preimages=None)
+    t.update(ITEMS)
+
+    loaded = pickle.loads(pickle.dumps(t))
+
+    assert sorted(loaded.items()) == sorted(ITEMS)
+    assert loaded.max_preimages is None
+
+
+def test_secure_trie_transaction():
+    secure = SecureTrie(max_preimages=None)
+    expected = SecureTrie(max_preimages=None)
+    secure.update(ITEMS[:10])
+    expected.update(ITEMS[:10])
+
+    with secure.transaction() as tx:
+        for key, value in ITEMS[10:]:
+            tx[key] = value
+            expected[key] = value
+        for key, _ in ITEMS[:5]:
+            del tx[key]
+            del expected[key]
+
+        assert tx[ITEMS[20][0]] == ITEMS[20][1]
+
+        # Preimages are only updated when the transaction is frozen
+        assert len(secure.preimages) == 10
+
+    assert secure._root == expected._root
+    assert secure.preimages == expected.preimages
+    assert dict(secure.items()) == dict(ITEMS[5:])
+
+
+@pytest.mark.parametrize('workers', (None, 1, 3))
+def test_secure_trie_from_items(workers):
+    expected = SecureTrie()
+    expected.update(ITEMS)
+
+    t = SecureTrie.from_items(ITEMS, workers=workers)
+
+    assert type(t) is SecureTrie
+    assert t._root == expected._root
+    for key, value in ITEMS:
+        assert t[key] == value
+
+
+def test_secure_trie_prefix_operations_not_supported():
+    t = SecureTrie()
+    t.update(ITEMS)
+
+    with pytest.raises(TypeError, match='prefixes'):
+        t.delete_prefix(b'\x01')
+
+    with pytest.raises(TypeError, match='prefixes'):
+        t.graft(b'\x01', SimpleTrie())
+
+
+def test_secure_trie_positional_arguments_match_simple_trie():
+    pool = InternPool()
+    t = SecureTrie({}, None, False, pool)
+
+    assert t.cache_encodings is False
+    assert t.intern_pool is pool
+    assert t.max_preimages == 0
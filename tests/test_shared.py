@@ -0,0 +1,138 @@
+from concurrent.futures import ProcessPoolExecutor
+import os
+import subprocess
+import sys
+
+from hypothesis import (
+    given,
+    settings,
+    strategies as st,
+)
+import pytest
+
+from simpletrie.shared import (
+    SharedTrieReader,
+    SharedTrieWriter,
+    build_image,
+)
+from simpletrie.trie import (
+    SimpleTrie,
+)
+
+
+keys = st.binary(max_size=4)
+key_value_pairs = st.tuples(keys, st.binary(max_size=4))
+pair_lists = st.lists(key_value_pairs, max_size=50, unique_by=lambda pair: pair[0])
+
+
+@pytest.fixture
+def writer():
+    with SharedTrieWriter() as w:
+        yield w
+
+
+@settings(deadline=None, max_examples=50)
+@given(pair_lists, st.lists(keys, max_size=10))
+def test_shared_trie_reader(pairs, other_keys):
+    t = SimpleTrie()
+    t.update(pairs)
+    items = dict(pairs)
+
+    with SharedTrieWriter() as w:
+        w.publish(t)
+
+        with SharedTrieReader(w.name) as r:
+            assert len(r) == len(items)
+            for key, value in items.items():
+                assert r[key] == value
+
+            assert r.get_many(other_keys, b'x') == [items.get(k, b'x') for k in other_keys]
+            assert list(r.items()) == sorted(items.items())
+
+            for prefix in other_keys:
+                assert list(r.items(prefix)) == sorted(
+                    (k, v) for k, v in items.items() if k.startswith(prefix)
+                )
+
+
+def test_shared_trie_reader_generations(writer):
+    t = SimpleTrie()
+    t[b'abc'] = b'1'
+
+    with SharedTrieReader(writer.name) as r:
+        # Nothing published yet
+        assert r.generation == 0
+        assert len(r) == 0
+        with pytest.raises(KeyError):
+            r[b'abc']
+
+        assert writer.publish(t) == 1
+        assert r.refresh() == 1
+        assert r[b'abc'] == b'1'
+
+        t[b'abd'] = b'2'
+        assert writer.publish(t) == 2
+
+        # Readers stay on their generation until refreshed
+        assert list(r) == [b'abc']
+        assert r.refresh() == 2
+        assert list(r) == [b'abc', b'abd']
+
+
+def test_build_image_resolves_committed_nodes():
+    items = [(bytes((i,)) * (i % 7), bytes((i,)) * (i % 40)) for i in range(100)]
+
+    t = SimpleTrie({})
+    t.update(items)
+    reopened = SimpleTrie(t.db, t.commit())
+
+    assert build_image(reopened) == build_image(t)
+
+
+def _read(name, keys):
+    with SharedTrieReader(name) as r:
+        return r.get_many(keys)
+
+
+def test_shared_trie_reader_in_other_processes(writer):
+    items = [(bytes((i,)) * (i % 7 + 1), bytes((i,))) for i in range(100)]
+
+    t = SimpleTrie()
+    t.update(items)
+    writer.publish(t)
+
+    keys = [k for k, _ in items]
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        results = list(executor.map(_read, [writer.name] * 2, [keys] * 2))
+
+    assert results == [[v for _, v in items]] * 2
+
+
+def test_shared_trie_reader_in_unrelated_process(writer):
+    t = SimpleTrie()
+    t[b'abc'] = b'1'
+    writer.publish(t)
+
+    # A process which is not a child of this one has its own resource tracker
+    # which must not unlink the writer's segments when the process exits
+    script = (
+        'from simpletrie.shared import SharedTrieReader\n'
+        'with SharedTrieReader({!r}) as r:\n'
+        '    assert r[b"abc"] == b"1"\n'
+    ).format(writer.name)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    result = subprocess.run(
+        [sys.executable, '-c', script],
+        cwd=root,
+        stderr=subprocess.PIPE,
+    )
+
+    assert result.returncode == 0, result.stderr.decode()
+    assert b'leaked' not in result.stderr
+
+    with SharedTrieReader(writer.name) as r:
+        assert r[b'abc'] == b'1'
+
+    t[b'abd'] = b'2'
+    writer.publish(t)
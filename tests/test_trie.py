@@ -1,9 +1,15 @@
+import pickle
+import sys
+
 import pytest
 
 from simpletrie.trie import (
     Branch,
     Extension,
+    HashNode,
     Leaf,
+    SimpleTrie,
+    flatten_node,
 )
 
 
@@ -131,3 +137,134 @@ def test_extension_insert():
     )
 
     assert actual == expected
+
+
+@pytest.mark.parametrize(
+    'items',
+    (
+        [],
+        [(b'', b'\x00')],
+        [(b'\x01', b'\x00'), (b'\x01\x02', b'\x01'), (b'\x01\x02\x03', b'\x02')],
+        [(bytes((i, j)), bytes((i,))) for i in range(0, 256, 15) for j in range(3)],
+        [(b'', b'\x00'), (b'\xff', b'\x01'), (b'\xff', b'\x02'), (b'', b'\x03')],
+        [(bytes((i % 7, i)), bytes((i,))) for i in range(200)],
+    ),
+)
+def test_simple_trie_from_items(items):
+    serial = SimpleTrie()
+    for k, v in items:
+        serial[k] = v
+
+    assert SimpleTrie.from_items(items)._root == serial._root
+    assert SimpleTrie.from_items(items, workers=3)._root == serial._root
+
+
+def test_simple_trie_pickle_deep():
+    # Build a trie deeper than the recursion limit allows to pickle with node
+    # objects
+    depth = sys.getrecursionlimit() * 2
+
+    root = Leaf((), b'\x00')
+    for i in range(depth):
+        root = Branch([root] + [None] * 14 + [Leaf((), bytes((i % 256,)))], None)
+
+    t = SimpleTrie()
+    t._root = root
+
+    loaded = pickle.loads(pickle.dumps(t))
+
+    assert flatten_node(loaded._root) == flatten_node(root)
+
+
+def test_simple_trie_write_deep():
+    # Write keys nested deeper than the recursion limit would allow with
+    # recursive writes
+    keys = [b'\x00' * i for i in range(sys.getrecursionlimit())]
+
+    t = SimpleTrie()
+    for k in keys:
+        t[k] = k
+
+    for k in reversed(keys):
+        del t[k]
+
+    assert t._root is None
+
+
+def test_simple_trie_transaction():
+    t = SimpleTrie()
+    t.update([(b'abc', b'1'), (b'abd', b'2')])
+    root = t._root
+
+    with t.transaction() as tx:
+        tx[b'abe'] = b'3'
+        tx[b'abe'] = b'4'
+        del tx[b'abc']
+
+        assert tx[b'abe'] == b'4'
+        assert len(tx) == 2
+        with pytest.raises(KeyError):
+            tx[b'abc']
+
+        # Trie is unchanged until the transaction is frozen
+        assert t._root is root
+
+    assert not tx.is_open
+    assert dict(t.items()) == {b'abd': b'2', b'abe': b'4'}
+
+    with pytest.raises(ValueError):
+        tx[b'abf'] = b'5'
+
+
+def test_simple_trie_transaction_discarded_on_error():
+    t = SimpleTrie()
+    t[b'abc'] = b'1'
+    root = t._root
+
+    with pytest.raises(RuntimeError):
+        with t.transaction() as tx:
+            tx[b'abd'] = b'2'
+            raise RuntimeError
+
+    assert not tx.is_open
+    assert t._root is root
+
+
+def test_simple_trie_cache_encodings():
+    items = [(bytes((i,)) * (i % 7), bytes((i,)) * (i % 40)) for i in range(100)]
+
+    t = SimpleTrie({})
+    t.update(items)
+    root = t._root
+    t.commit()
+
+    assert root._encoding is not None
+
+    uncached = SimpleTrie({}, cache_encodings=False)
+    uncached.update(items)
+    uncached_root = uncached._root
+    uncached.commit()
+
+    assert not hasattr(uncached_root, '_encoding')
+    assert uncached.db == t.db
+
+
+def test_simple_trie_evict():
+    items = [(bytes((i,)) * (i % 7), bytes((i,)) * (i % 40)) for i in range(100)]
+
+    t = SimpleTrie({})
+    t.update(items)
+    t.commit()
+    t[b'new'] = b'value'
+
+    resolved = t._root.nodes[0].node
+    assert resolved._encoding is not None
+
+    t.evict()
+
+    assert not t._root.nodes[0].is_resolved
+    assert resolved._encoding is None
+    assert dict(t.items()) == dict(items + [(b'new', b'value')])
+
+    with pytest.raises(ValueError):
+        HashNode(b'\x00' * 32).evict()
@@ -1,4 +1,5 @@
 import functools
+import pickle
 
 from hypothesis import (
     given,
@@ -12,6 +13,10 @@ from simpletrie.trie import (
     Extension,
     Leaf,
     SimpleTrie,
+    delete_key,
+    flatten_node,
+    insert_key,
+    unflatten_node,
 )
 from simpletrie.utils import (
     bytes_to_nibbles,
@@ -76,6 +81,21 @@ def test_node_copy_properties(node):
     assert node is not copy
 
 
+@settings(max_examples=25)
+@given(nodes)
+def test_node_flatten_properties(node):
+    flat = flatten_node(node)
+
+    assert unflatten_node(flat) == node
+    assert flatten_node(unflatten_node(flat)) == flat
+
+
+@settings(max_examples=25)
+@given(nodes)
+def test_node_pickle_properties(node):
+    assert pickle.loads(pickle.dumps(node)) == node
+
+
 @settings(max_examples=25)
 @given(nodes)
 def test_node_radd_properties(node):
@@ -103,6 +123,56 @@ def test_delete_insert_get_leaf_for_node(node, leaf):
     assert node.get(leaf.key) == leaf.value
 
 
+@settings(max_examples=50)
+@given(st.one_of(st.none(), nodes), leaves)
+def test_insert_key_properties(node, leaf):
+    assert insert_key(node, leaf.key, leaf.value) == node + leaf
+
+
+@settings(max_examples=50)
+@given(nodes, nibbles)
+def test_delete_key_properties(node, key):
+    try:
+        expected = node - key
+    except KeyError:
+        with pytest.raises(KeyError):
+            delete_key(node, key)
+    else:
+        assert delete_key(node, key) == expected
+
+
+@settings(max_examples=50)
+@given(nodes, leaves)
+def test_delete_inserted_key_properties(node, leaf):
+    node += leaf
+
+    assert delete_key(node, leaf.key) == node - leaf.key
+
+
+@settings(deadline=None)
+@given(st.lists(st.tuples(st.binary(max_size=8), st.binary()), max_size=100))
+def test_simple_trie_structure_properties(pairs):
+    t = SimpleTrie()
+    expected = None
+
+    # Writes should give the same structure as recursive node operations
+    for key, value in pairs:
+        t[key] = value
+        expected += Leaf(tuple(bytes_to_nibbles(key)), value)
+
+        assert t._root == expected
+
+    for key, _ in pairs[::2]:
+        try:
+            del t[key]
+        except KeyError:
+            continue
+
+        expected -= tuple(bytes_to_nibbles(key))
+
+        assert t._root == expected
+
+
 key_value_pairs = st.tuples(st.binary(max_size=100), st.binary())
 
 
@@ -147,3 +217,243 @@ def test_simple_trie_properties(pairs):
 
     # Trie contain no values
     assert len(t) == 0
+
+
+@settings(max_examples=25)
+@given(nodes, st.lists(nibbles, max_size=20))
+def test_node_get_many_properties(node, keys):
+    keys = sorted(keys)
+    default = object()
+
+    expected = []
+    for key in keys:
+        try:
+            expected.append(node.get(key))
+        except KeyError:
+            expected.append(default)
+
+    assert node.get_many(keys, default) == expected
+
+
+@settings(deadline=None)
+@given(
+    st.lists(key_value_pairs, max_size=100, unique_by=lambda pair: pair[0]),
+    st.lists(st.binary(max_size=100), max_size=20),
+)
+def test_simple_trie_get_many_properties(pairs, missing_keys):
+    t = SimpleTrie()
+
+    for key, value in pairs:
+        t[key] = value
+
+    keys = [key for key, _ in pairs] + missing_keys
+    default = object()
+
+    expected = []
+    for key in keys:
+        try:
+            expected.append(t[key])
+        except KeyError:
+            expected.append(default)
+
+    assert t.get_many(keys, default) == expected
+
+
+@settings(deadline=None, max_examples=50)
+@given(
+    st.lists(key_value_pairs, max_size=100, unique_by=lambda pair: pair[0]),
+    st.integers(min_value=0, max_value=100),
+)
+def test_simple_trie_commit_properties(pairs, num_deleted):
+    db = {}
+    t = SimpleTrie(db)
+
+    for key, value in pairs:
+        t[key] = value
+
+    root_hash = t.commit()
+    reopened = SimpleTrie(db, root_hash)
+
+    # Committed trie should have same contents and structure as original
+    assert len(reopened) == len(pairs)
+    for key, value in pairs:
+        assert reopened[key] == value
+    if t._root is not None:
+        assert reopened._root.copy() == t._root.copy()
+
+    # Committing again without changes should write nothing
+    num_nodes = len(db)
+    assert t.commit() == root_hash
+    assert len(db) == num_nodes
+
+    # Modifying and committing reopened trie should match modifying original
+    for key, _ in pairs[:num_deleted]:
+        del t[key]
+        del reopened[key]
+
+    assert reopened.commit() == t.commit()
+
+
+def assert_trie_contents(t, items):
+    assert len(t) == len(items)
+    for key, value in items.items():
+        assert t[key] == value
+
+
+short_keys = st.binary(max_size=4)
+short_key_value_pairs = st.tuples(short_keys, st.binary())
+
+
+@settings(deadline=None)
+@given(
+    st.lists(short_key_value_pairs, max_size=50, unique_by=lambda pair: pair[0]),
+    short_keys,
+)
+def test_simple_trie_delete_prefix_properties(pairs, prefix):
+    t = SimpleTrie()
+    for key, value in pairs:
+        t[key] = value
+
+    t.delete_prefix(prefix)
+
+    assert_trie_contents(t, {
+        key: value for key, value in pairs
+        if not key.startswith(prefix)
+    })
+    for key, _ in pairs:
+        if key.startswith(prefix):
+            with pytest.raises(KeyError):
+                t[key]
+
+
+@settings(deadline=None)
+@given(
+    st.lists(short_key_value_pairs, max_size=50, unique_by=lambda pair: pair[0]),
+    st.lists(short_key_value_pairs, max_size=50, unique_by=lambda pair: pair[0]),
+    short_keys,
+)
+def test_simple_trie_graft_properties(pairs, other_pairs, prefix):
+    t = SimpleTrie()
+    for key, value in pairs:
+        t[key] = value
+
+    other = SimpleTrie()
+    for key, value in other_pairs:
+        other[key] = value
+
+    t.graft(prefix, other)
+
+    expected = {
+        key: value for key, value in pairs
+        if not key.startswith(prefix)
+    }
+    expected.update((prefix + key, value) for key, value in other_pairs)
+
+    assert_trie_contents(t, expected)
+
+    # Grafted trie should continue to behave normally
+    for key, value in other_pairs:
+        del t[prefix + key]
+    for key, value in other_pairs:
+        t[prefix + key] = value
+
+    assert_trie_contents(t, expected)
+
+
+@settings(deadline=None, max_examples=50)
+@given(
+    st.lists(key_value_pairs, max_size=100, unique_by=lambda pair: pair[0]),
+    st.integers(min_value=0, max_value=100),
+)
+def test_simple_trie_pickle_properties(pairs, num_committed):
+    db = {}
+    t = SimpleTrie(db)
+
+    # Trie should contain both committed and uncommitted nodes
+    for key, value in pairs[:num_committed]:
+        t[key] = value
+    t.commit()
+    for key, value in pairs[num_committed:]:
+        t[key] = value
+
+    for protocol in range(2, pickle.HIGHEST_PROTOCOL + 1):
+        loaded = pickle.loads(pickle.dumps(t, protocol))
+
+        assert loaded.db == db
+        assert_trie_contents(loaded, dict(pairs))
+        if t._root is not None:
+            assert loaded._root.copy() == t._root.copy()
+
+
+@settings(deadline=None)
+@given(st.lists(key_value_pairs, max_size=100, unique_by=lambda pair: pair[0]))
+def test_simple_trie_items_properties(pairs):
+    t = SimpleTrie()
+    t.update(pairs)
+
+    assert list(t.items()) == sorted(pairs)
+    assert list(t) == sorted(key for key, _ in pairs)
+
+
+@settings(deadline=None)
+@given(
+    st.lists(key_value_pairs, max_size=50),
+    st.lists(st.tuples(st.booleans(), st.binary(max_size=8), st.binary()), max_size=100),
+)
+def test_simple_trie_transaction_properties(pairs, ops):
+    t = SimpleTrie()
+    t.update(pairs)
+
+    before = t._root and flatten_node(t._root)
+    root = t._root
+
+    expected = SimpleTrie()
+    expected._root = root
+
+    with t.transaction() as tx:
+        for is_delete, key, value in ops:
+            if is_delete:
+                try:
+                    del expected[key]
+                except KeyError:
+                    with pytest.raises(KeyError):
+                        del tx[key]
+                else:
+                    del tx[key]
+            else:
+                expected[key] = value
+                tx[key] = value
+
+            # Writes should give the same structure as copying writes
+            assert tx._root == expected._root
+
+        # Nodes shared with the trie should not be modified
+        assert t._root is root
+        assert (root and flatten_node(root)) == before
+
+    assert t._root == expected._root
+    assert (root and flatten_node(root)) == before
+
+
+@settings(deadline=None, max_examples=50)
+@given(
+    st.lists(key_value_pairs, max_size=100, unique_by=lambda pair: pair[0]),
+    st.lists(key_value_pairs, max_size=20),
+)
+def test_simple_trie_cached_encoding_properties(pairs, other_pairs):
+    t = SimpleTrie({})
+    t.update(pairs)
+
+    # Other trie shares uncommitted nodes with the first
+    other = SimpleTrie({})
+    other._root = t._root
+    uncached = SimpleTrie({}, cache_encodings=False)
+    uncached._root = t._root
+
+    t.commit()
+    other.update(other_pairs)
+    uncached.update(other_pairs)
+
+    # Reusing cached encodings should give the same hashes and nodes
+    assert other.commit() == uncached.commit()
+    assert other.db == uncached.db
@@ -5,11 +5,16 @@ from hypothesis import (
 import pytest
 
 from simpletrie.utils import (
+    bytes_to_nibble_bytes,
     bytes_to_nibbles,
+    decode_hex_prefix,
     hex_prefix,
     indent,
     prefix_length,
+    nibble_bytes_to_bytes,
     nibbles_to_bytes,
+    rlp_decode,
+    rlp_encode,
 )
 
 
@@ -22,6 +27,14 @@ def test_bytes_to_nibbles_to_bytes(byte_str):
     assert b''.join(nibbles_to_bytes(bytes_to_nibbles(byte_str))) == byte_str
 
 
+@given(byte_strs)
+def test_bytes_to_nibble_bytes(byte_str):
+    nibble_bytes = bytes_to_nibble_bytes(byte_str)
+
+    assert nibble_bytes == bytes(bytes_to_nibbles(byte_str))
+    assert nibble_bytes_to_bytes(nibble_bytes) == byte_str
+
+
 @given(nibble_lists)
 def test_nibbles_to_bytes_to_nibbles(nibble_list):
     if len(nibble_list) % 2 == 1:
@@ -83,6 +96,56 @@ def test_hex_prefix(nibble_list):
         assert nibbles_without_flag[1:] == nibble_list
 
 
+@given(nibble_lists, st.booleans())
+def test_hex_prefix_to_nibbles(nibble_list, t):
+    assert decode_hex_prefix(b''.join(hex_prefix(nibble_list, t))) == (tuple(nibble_list), t)
+
+
+rlp_items = st.recursive(
+    byte_strs,
+    lambda s: st.lists(s, max_size=5),
+    max_leaves=20,
+)
+
+
+@pytest.mark.parametrize(
+    'item, expected',
+    (
+        (b'', b'\x80'),
+        (b'\x00', b'\x00'),
+        (b'\x7f', b'\x7f'),
+        (b'\x80', b'\x81\x80'),
+        (b'dog', b'\x83dog'),
+        ([], b'\xc0'),
+        ([b'cat', b'dog'], b'\xc8\x83cat\x83dog'),
+        ([[], [[]], [[], [[]]]], b'\xc7\xc0\xc1\xc0\xc3\xc0\xc1\xc0'),
+        (b'a' * 56, b'\xb8\x38' + b'a' * 56),
+        ([b'a' * 55], b'\xf8\x38\xb7' + b'a' * 55),
+    ),
+)
+def test_rlp_encode(item, expected):
+    assert rlp_encode(item) == expected
+
+
+@given(rlp_items)
+def test_rlp_encode_decode(item):
+    assert rlp_decode(rlp_encode(item)) == item
+
+
+@pytest.mark.parametrize(
+    'input, match',
+    (
+        (b'', 'truncated'),
+        (b'\x83do', 'truncated'),
+        (b'\x83dogs', 'trailing'),
+        (b'\xc2\x83dog', 'inconsistent'),
+    ),
+)
+def test_rlp_decode_invalid(input, match):
+    with pytest.raises(ValueError, match=match):
+        rlp_decode(input)
+
+
 def test_indent():
     short_txt = """
 foo